@@ -0,0 +1,67 @@
+# Учетные записи игроков в sqlite: поиск по индексу имени, регистрация -
+# вставка одной строки в транзакции, без перезаписи всего файла.
+# При первом открытии в базу переносятся записи из старого accounts.json;
+# если файл прочитать не удалось, перенос повторяется при следующем запуске.
+
+import json
+import sqlite3
+from pathlib import Path
+
+
+class AccountStore:
+
+    # user_version базы: 1 - записи из accounts.json перенесены
+    MIGRATED = 1
+
+    def __init__(self, path=None, legacy=None):
+        self.path = Path(path) if path is not None else Path(__file__).with_name('accounts.db')
+        self.legacy = Path(legacy) if legacy is not None else self.path.with_name('accounts.json')
+        # ошибка переноса старого файла; перенос повторится при следующем запуске
+        self.migration_error = None
+        db = self._connect()
+        try:
+            with db:
+                db.execute('CREATE TABLE IF NOT EXISTS accounts (name TEXT PRIMARY KEY, hash TEXT NOT NULL)')
+                if db.execute('PRAGMA user_version').fetchone()[0] < self.MIGRATED:
+                    self._migrate(db)
+        finally:
+            db.close()
+
+    def _migrate(self, db):
+        if self.legacy.is_file():
+            try:
+                with self.legacy.open('r') as fp:
+                    accounts = json.load(fp)
+                if not isinstance(accounts, dict):
+                    raise ValueError('ожидался объект {логин: хеш пароля}')
+            except (OSError, ValueError) as e:
+                self.migration_error = f'Не удалось перенести учетные записи из {self.legacy.name}: {e}'
+                return
+            db.executemany('INSERT OR IGNORE INTO accounts VALUES (?, ?)', accounts.items())
+        # в той же транзакции, что и перенос записей
+        db.execute(f'PRAGMA user_version = {self.MIGRATED}')
+
+    def _connect(self):
+        # соединение на каждую операцию: методы вызываются из рабочих потоков
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _execute(self, query, args):
+        db = self._connect()
+        try:
+            with db:
+                return db.execute(query, args).fetchone()
+        finally:
+            db.close()
+
+    def get_hash(self, name):
+        """Хеш пароля пользователя или None, если его нет."""
+        row = self._execute('SELECT hash FROM accounts WHERE name = ?', (name,))
+        return row[0] if row is not None else None
+
+    def add(self, name, password_hash):
+        """Добавляет пользователя; False, если такое имя уже занято."""
+        try:
+            self._execute('INSERT INTO accounts VALUES (?, ?)', (name, password_hash))
+        except sqlite3.IntegrityError:
+            return False
+        return True
@@ -0,0 +1,162 @@
+# Замеры: perft для проверки генератора ходов и поиск Minimax на
+# фиксированной глубине по набору позиций (узлы, время, узлов в секунду).
+#
+#   python benchmark.py perft [FEN] --depth 4 [--divide] [--verify]
+#   python benchmark.py perft --file benchmark.fen
+#   python benchmark.py search --depth 4 5 [--file benchmark.fen] [--json]
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from bot import Minimax
+from config import Config
+from evaluation import full_score
+from position import Position, move_name
+from ttable import TranspositionTable
+
+POSITIONS_FILE = Path(__file__).with_name('benchmark.fen')
+
+
+def load_positions(path=POSITIONS_FILE):
+    """Строки файла: FEN ; имя ; D1 n ; D2 n ... (D<глубина> - ожидаемый perft).
+    Пустые строки и строки с # пропускаются."""
+    positions = []
+    with Path(path).open('r') as fp:
+        for line in fp:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            fields = [field.strip() for field in line.split(';')]
+            fen = fields[0]
+            name = fields[1] if len(fields) > 1 else fen
+            expected = {}
+            for field in fields[2:]:
+                depth, count = field.split()
+                expected[int(depth[1:])] = int(count)
+            positions.append((name, fen, expected))
+    return positions
+
+
+def perft(position, depth, verify=False):
+    if verify and (position.score != full_score(position) or position.hash != Position(position.fen()).hash):
+        raise AssertionError(f'инкрементальная оценка или хеш разошлись: {position.fen()}')
+    if depth == 0:
+        return 1
+    moves = position.legal_moves()
+    if depth == 1 and not verify:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        position.make_move(move)
+        nodes += perft(position, depth - 1, verify)
+        position.unmake_move()
+    return nodes
+
+
+def divide(position, depth):
+    """perft по каждому ходу из корня."""
+    result = {}
+    for move in position.legal_moves():
+        position.make_move(move)
+        result[move_name(move)] = perft(position, depth - 1)
+        position.unmake_move()
+    return result
+
+
+def search(fen, depth):
+    position = Position(fen)
+    bot = Minimax(None, position.turn, depth)
+    # таблицы эндшпиля не используются: замеряется сам поиск
+    bot.tt = TranspositionTable(Config.get().TT_SIZE_MB)
+    start = time.perf_counter()
+    move = bot.iterativeDeepening(position)
+    elapsed = time.perf_counter() - start
+    return {
+        'depth': depth,
+        'move': move_name(move) if move is not None else None,
+        'nodes': bot.nodes,
+        'time': round(elapsed, 3),
+        'nps': round(bot.nodes / elapsed) if elapsed else 0,
+        'evals': bot.stats.evals,
+        'firstMoveCutoffRate': bot.stats.firstMoveCutoffRate(),
+        'ttHitRate': bot.stats.ttHitRate(),
+        'branchingFactor': bot.stats.branchingFactor(),
+    }
+
+
+def run_perft(args):
+    if args.file or args.fen is None:
+        positions = load_positions(args.file or POSITIONS_FILE)
+    else:
+        positions = [(args.fen, args.fen, {})]
+
+    errors = 0
+    for name, fen, expected in positions:
+        depths = [args.depth] if args.depth else sorted(expected) or [3]
+        for depth in depths:
+            position = Position(fen)
+            start = time.perf_counter()
+            if args.divide:
+                moves = divide(position, depth)
+                for move, count in sorted(moves.items()):
+                    print(f'{move}: {count}')
+                nodes = sum(moves.values())
+            else:
+                nodes = perft(position, depth, args.verify)
+            elapsed = time.perf_counter() - start
+            status = ''
+            if depth in expected:
+                ok = nodes == expected[depth]
+                errors += not ok
+                status = 'ok' if ok else f'ОШИБКА, ожидалось {expected[depth]}'
+            print(f'{name}: perft({depth}) = {nodes}, {elapsed:.2f} с {status}')
+    return errors
+
+
+def run_search(args):
+    results = []
+    for name, fen, _ in load_positions(args.file or POSITIONS_FILE):
+        for depth in args.depth:
+            result = {'name': name, 'fen': fen}
+            result.update(search(fen, depth))
+            results.append(result)
+            if not args.json:
+                ebf = result['branchingFactor']
+                print(f"{name}: глубина {depth}, ход {result['move']}, узлов {result['nodes']}, "
+                      f"ветвление {f'{ebf:.1f}' if ebf is not None else '-'}, "
+                      f"{result['time']:.2f} с, {result['nps']} узл/с")
+
+    nodes = sum(result['nodes'] for result in results)
+    elapsed = sum(result['time'] for result in results)
+    total = {'nodes': nodes, 'time': round(elapsed, 3), 'nps': round(nodes / elapsed) if elapsed else 0}
+    if args.json:
+        print(json.dumps({'positions': results, 'total': total}, indent=2, ensure_ascii=False))
+    else:
+        print(f"всего: узлов {total['nodes']}, {total['time']:.2f} с, {total['nps']} узл/с")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='perft и замер скорости поиска')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    perft_parser = commands.add_parser('perft', help='число листьев дерева ходов')
+    perft_parser.add_argument('fen', nargs='?', help='позиция (по умолчанию - позиции из файла)')
+    perft_parser.add_argument('--depth', type=int, help='глубина (по умолчанию - все глубины из файла)')
+    perft_parser.add_argument('--file', help='файл позиций')
+    perft_parser.add_argument('--divide', action='store_true', help='счет по каждому ходу из корня')
+    perft_parser.add_argument('--verify', action='store_true',
+                              help='сверять инкрементальные оценку и хеш с пересчетом в каждом узле')
+
+    search_parser = commands.add_parser('search', help='поиск Minimax на фиксированной глубине')
+    search_parser.add_argument('--depth', type=int, nargs='+', default=[Config.get().DIFFICULTY])
+    search_parser.add_argument('--file', help='файл позиций')
+    search_parser.add_argument('--json', action='store_true', help='вывод в JSON для сравнения между версиями')
+
+    args = parser.parse_args()
+    if args.command == 'perft':
+        if run_perft(args):
+            raise SystemExit(1)
+    else:
+        run_search(args)
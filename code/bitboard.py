@@ -0,0 +1,102 @@
+# Битборды: 64-битное целое, бит с номером y * 8 + x соответствует клетке (x, y),
+# y = 0 - восьмая горизонталь, как в Position.
+
+FULL = (1 << 64) - 1
+
+# направления (dx, dy); для лучей с ростом номера клетки ближайший блокер -
+# младший бит, для остальных - старший
+NORTH, NORTH_EAST, EAST, SOUTH_EAST, SOUTH, SOUTH_WEST, WEST, NORTH_WEST = range(8)
+DIRECTIONS = ((0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1))
+POSITIVE = (False, False, True, True, True, True, False, False)
+
+ROOK_DIRECTIONS = (NORTH, EAST, SOUTH, WEST)
+BISHOP_DIRECTIONS = (NORTH_EAST, SOUTH_EAST, SOUTH_WEST, NORTH_WEST)
+
+
+def bit(sq):
+    return 1 << sq
+
+
+def lsb(bb):
+    return (bb & -bb).bit_length() - 1
+
+
+def msb(bb):
+    return bb.bit_length() - 1
+
+
+def popcount(bb):
+    return bin(bb).count('1')
+
+
+def squares(bb):
+    """Номера установленных битов в порядке возрастания."""
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+def _ray(sq, direction):
+    dx, dy = DIRECTIONS[direction]
+    x, y = sq % 8 + dx, sq // 8 + dy
+    bb = 0
+    while 0 <= x < 8 and 0 <= y < 8:
+        bb |= bit(y * 8 + x)
+        x, y = x + dx, y + dy
+    return bb
+
+
+def _king_attacks(sq):
+    bb = 0
+    for dx, dy in DIRECTIONS:
+        x, y = sq % 8 + dx, sq // 8 + dy
+        if 0 <= x < 8 and 0 <= y < 8:
+            bb |= bit(y * 8 + x)
+    return bb
+
+
+RAYS = tuple(tuple(_ray(sq, d) for sq in range(64)) for d in range(8))
+KING_ATTACKS = tuple(_king_attacks(sq) for sq in range(64))
+ROOK_MASKS = tuple(RAYS[NORTH][sq] | RAYS[EAST][sq] | RAYS[SOUTH][sq] | RAYS[WEST][sq] for sq in range(64))
+BISHOP_MASKS = tuple(RAYS[NORTH_EAST][sq] | RAYS[SOUTH_EAST][sq] | RAYS[SOUTH_WEST][sq] | RAYS[NORTH_WEST][sq]
+                     for sq in range(64))
+
+
+def _between(a, b):
+    for d in range(8):
+        if RAYS[d][a] & bit(b):
+            return RAYS[d][a] & ~RAYS[d][b] & ~bit(b)
+    return 0
+
+
+# клетки строго между a и b, если они на одной линии, иначе 0
+BETWEEN = tuple(tuple(_between(a, b) for b in range(64)) for a in range(64))
+
+
+def _slider_attacks(sq, occupied, directions):
+    attacks = 0
+    for d in directions:
+        ray = RAYS[d][sq]
+        blockers = ray & occupied
+        if blockers:
+            blocker = lsb(blockers) if POSITIVE[d] else msb(blockers)
+            # луч обрезается за первой занятой клеткой (сама клетка атакована)
+            ray ^= RAYS[d][blocker]
+        attacks |= ray
+    return attacks
+
+
+def rook_attacks(sq, occupied):
+    return _slider_attacks(sq, occupied, ROOK_DIRECTIONS)
+
+
+def bishop_attacks(sq, occupied):
+    return _slider_attacks(sq, occupied, BISHOP_DIRECTIONS)
+
+
+def king_attacks(sq, occupied=0):
+    return KING_ATTACKS[sq]
+
+
+ATTACKS = {'K': king_attacks, 'R': rook_attacks, 'B': bishop_attacks}
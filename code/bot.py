@@ -1,114 +1,612 @@
+import json
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from pathlib import Path
+
+from config import Config
+from evaluation import MATERIAL, EndgameEvaluator, load_weights
+from position import invert, move_from, move_name, move_to, square_pos
+from tablebase import Tablebase
+from ttable import EXACT, LOWER, UPPER, TranspositionTable
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class SearchStats:
+    """Счетчики одного поиска хода: заполняются в Minimax.minimax и
+    доступны после getBestMove как Minimax.stats."""
+
+    # счетчики, которые суммируются с результатами процессов пула
+    COUNTERS = ('qnodes', 'evals', 'repetitions', 'cutoffs', 'firstMoveCutoffs', 'ttProbes', 'ttHits', 'ttCutoffs')
+
+    def __init__(self):
+        self.nodes = 0
+        # узлы форсированного поиска взятий (входят в nodes)
+        self.qnodes = 0
+        self.evals = 0
+        self.repetitions = 0
+        self.cutoffs = 0
+        self.firstMoveCutoffs = 0
+        self.ttProbes = 0
+        self.ttHits = 0
+        self.ttCutoffs = 0
+        # завершенные итерации: глубина, узлы, секунды, оценка, главный вариант
+        self.depths = []
+        self.move = None
+        self.score = None
+        self.pv = []
+        self.time = 0.0
+        self.tablebase = False
+
+    def __str__(self):
+        rate = self.firstMoveCutoffRate()
+        hits = self.ttHitRate()
+        ebf = self.branchingFactor()
+        return (f"ход {self.move}, оценка {self.score}, глубина {self.depth()}, узлов {self.nodes} (взятий {self.qnodes}), "
+                f"оценок {self.evals}, отсечений {self.cutoffs}"
+                f"{f' ({rate:.0%} на первом ходе)' if rate is not None else ''}, "
+                f"попаданий в ТТ {f'{hits:.0%}' if hits is not None else '-'}, "
+                f"ветвление {f'{ebf:.1f}' if ebf is not None else '-'}, {self.time:.2f} с, "
+                f"вариант {' '.join(self.pv)}")
+
+    def merge(self, other):
+        for name in self.COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def depth(self):
+        return self.depths[-1]['depth'] if self.depths else 0
+
+    def firstMoveCutoffRate(self):
+        """Доля отсечений на первом ходе - мера качества упорядочивания."""
+        return self.firstMoveCutoffs / self.cutoffs if self.cutoffs else None
+
+    def ttHitRate(self):
+        return self.ttHits / self.ttProbes if self.ttProbes else None
+
+    def branchingFactor(self):
+        """Эффективный коэффициент ветвления: отношение узлов двух последних итераций."""
+        if len(self.depths) < 2 or not self.depths[-2]['nodes']:
+            return None
+        return self.depths[-1]['nodes'] / self.depths[-2]['nodes']
+
+    def asDict(self):
+        result = {name: getattr(self, name) for name in ('move', 'score', 'nodes') + self.COUNTERS}
+        result.update(firstMoveCutoffRate=self.firstMoveCutoffRate(), ttHitRate=self.ttHitRate(),
+                      branchingFactor=self.branchingFactor(),
+                      time=round(self.time, 3), tablebase=self.tablebase, pv=self.pv, depths=self.depths)
+        return result
+
+
+# корневые ходы ищутся с окном чуть ниже alpha, чтобы ходы с равной лучшей
+# оценкой тоже получали точную оценку и выбор не зависел от порядка завершения
+ROOT_EPSILON = 0.01
+
+# состояние процесса пула параллельного поиска
+_searcher = None
+_sharedAlpha = None
+
+
+def _initSearchWorker(sharedAlpha, sharedStop, color, ttSizeMb):
+    global _searcher, _sharedAlpha
+    _sharedAlpha = sharedAlpha
+    _searcher = Minimax(None, color, 0)
+    _searcher.tt = TranspositionTable(ttSizeMb)
+    _searcher.sharedStop = sharedStop
+
+
+def _searchRootMove(position, move, depth, pvMoves, deadline, ttAge):
+    """Ищет один корневой ход; возвращает (оценка, статистика), оценка None - время вышло."""
+    searcher = _searcher
+    # поколение таблицы процесса идет вместе с таблицей бота, иначе старые записи не вытесняются
+    searcher.tt.age = ttAge
+    searcher.nodes = 0
+    searcher.stats = SearchStats()
+    searcher.pvMoves = pvMoves
+    searcher.rootPly = len(position.stack)
+    # дедлайн передается по системным часам, perf_counter у процессов свой
+    searcher.deadline = None if deadline is None else time.perf_counter() + deadline - time.time()
+
+    alpha = _sharedAlpha.value
+    position.make_move(move)
+    try:
+        value = searcher.minimax(position, depth - 1, alpha - ROOT_EPSILON, 10000, False)
+    except SearchTimeout:
+        searcher.stats.nodes = searcher.nodes
+        return None, searcher.stats
+
+    with _sharedAlpha.get_lock():
+        if value > _sharedAlpha.value:
+            _sharedAlpha.value = value
+    searcher.stats.nodes = searcher.nodes
+    return value, searcher.stats
+
+
 class Minimax:
 
+    # оценка оставшегося числа ходов при распределении времени
+    MOVES_TO_GO = 30
+    # как часто (в узлах) проверять, не вышло ли время
+    TIME_CHECK_NODES = 1024
+    # ценность фигур для упорядочивания взятий (MVV-LVA)
+    ORDER_VALUES = {'K': 20, 'R': 5, 'B': 3}
+    # запас delta-отсечения в поиске взятий: насколько позиционные члены
+    # оценки могут измениться за одно взятие сверх стоимости фигуры
+    DELTA_MARGIN = 30
+
     def __init__(self, board, color, depth):
         self.board = board
         self.depth = depth
         self.color = color
-        self.player_color = self.board.invert(color)
-
-        self.bishopEval = [
-                [ -2.0, -1.0, -1.0, -1.0, -1.0, -1.0, -1.0, -2.0],
-                [ -1.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, -1.0],
-                [ -1.0, 0.0, 0.5, 1.0, 1.0, 0.5, 0.0, -1.0],
-                [ -1.0, 0.5, 0.5, 1.0, 1.0, 0.5, 0.5, -1.0],
-                [ -1.0, 0.0, 1.0, 1.0, 1.0, 1.0, 0.0, -1.0],
-                [ -1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, -1.0],
-                [ -1.0, 0.5, 0.0, 0.0, 0.0, 0.0, 0.5, -1.0],
-                [ -2.0, -1.0, -1.0, -1.0, -1.0, -1.0, -1.0, -2.0]
-            ]
-
-        self.rookEval = [
-                [  0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
-                [  0.5, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 0.5],
-                [ -0.5, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, -0.5],
-                [ -0.5, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, -0.5],
-                [ -0.5, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, -0.5],
-                [ -0.5, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, -0.5],
-                [ -0.5, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, -0.5],
-                [  0.0, 0.0, 0.0, 0.5, 0.5, 0.0, 0.0, 0.0]
-            ]
-
-        self.kingEval = [
-                [ -3.0, -4.0, -4.0, -5.0, -5.0, -4.0, -4.0, -3.0],
-                [ -3.0, -4.0, -4.0, -5.0, -5.0, -4.0, -4.0, -3.0],
-                [ -3.0, -4.0, -4.0, -5.0, -5.0, -4.0, -4.0, -3.0],
-                [ -3.0, -4.0, -4.0, -5.0, -5.0, -4.0, -4.0, -3.0],
-                [ -2.0, -3.0, -3.0, -4.0, -4.0, -3.0, -3.0, -2.0],
-                [ -1.0, -2.0, -2.0, -2.0, -2.0, -2.0, -2.0, -1.0],
-                [  2.0, 2.0, 0.0, 0.0, 0.0, 0.0, 2.0, 2.0],
-                [  2.0, 3.0, 1.0, 0.0, 0.0, 1.0, 3.0, 2.0]
-            ]
-
-    def getFigureValue(self, figure):
-        if figure is None:
-            return 0
-        x, y = figure.pos
+        self.player_color = invert(color)
+        self.evaluator = EndgameEvaluator(load_weights(Path(__file__).parent / Config.get().EVAL_WEIGHTS))
+        # таблица выделяется при первом поиске
+        self.tt = None
+        self.nodes = 0
+        self.depthNodes = []
+        self.stats = SearchStats()
+        self.deadline = None
+        self.softDeadline = None
+        # лимиты (момент, мягкий, жесткий) от ponderhit, еще не перенесенные в поиск
+        self.ponderLock = threading.Lock()
+        self.ponderLimits = None
+        # выставляется из другого потока, чтобы прервать поиск (сбрасывает вызывающий)
+        self.stopped = False
+        # в процессе пула - флаг остановки, общий с главным процессом
+        self.sharedStop = None
+        # вызывается после каждой завершенной итерации с ее записью из stats.depths
+        self.onIteration = None
+        self.rootPly = 0
+        # ходы-убийцы по ply и история отсечений {ход: вес}
+        self.killers = []
+        self.history = {}
+        # главный вариант предыдущей итерации: {хеш позиции: ход}
+        self.pvMoves = {}
+        # пул процессов для параллельного поиска создается при первом поиске
+        self.workers = Config.get().SEARCH_WORKERS
+        self.pool = None
+        self.sharedAlpha = None
+        self.poolStop = None
+
+    def evaluateBoard(self, position=None):
+        # оценка с точки зрения игрока; сумма по таблицам ведется в Position.make_move
+        position = self.board.position if position is None else position
+        score = self.evaluator.evaluate(position)
+        return score if self.player_color == 'w' else -score
+
+    def orderMoves(self, position, moves, hashMove, ply=0):
+        """Хеш-ход и ход главного варианта, затем взятия по MVV-LVA, шахи,
+        ходы-убийцы и остальные по истории отсечений."""
+        pvMove = self.pvMoves.get(position.hash)
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        squares = position.squares
+        values = self.ORDER_VALUES
 
-        def getAbsoluteValue():
-            if figure.notation == 'R':
-                return 50 + (self.rookEval[y][x] if figure.color == 'w' else self.rookEval[7 - y][x])
-            elif figure.notation == 'B':
-                return 33 + (self.bishopEval[y][x] if figure.color == 'w' else self.bishopEval[7 - y][x])
-            elif figure.notation == 'K':
-                return 900 + (self.kingEval[y][x] if figure.color == 'w' else  self.kingEval[7 - y][x])
+        def score(move):
+            if move == hashMove:
+                return 1 << 30
+            if move == pvMove:
+                return (1 << 30) - 1
+            victim = squares[move >> 6]
+            if victim is not None:
+                return (1 << 26) + values[victim.upper()] * 100 - values[squares[move & 63].upper()]
+            if position.gives_check(move):
+                return 1 << 25
+            if move in killers:
+                return (1 << 24) - killers.index(move)
+            return self.history.get(move, 0)
 
-        absoluteValue = getAbsoluteValue()
-        return absoluteValue if figure.color == self.player_color else -absoluteValue
+        moves.sort(key=score, reverse=True)
+        return moves
 
-    def evaluateBoard(self):
-        return sum(self.getFigureValue(s.figure) for s in self.board.find_squares_by_figure())
+    def storeKiller(self, ply, move):
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
 
-    def minimaxRoot (self, depth, is_maximazing):
+    def minimaxRoot (self, position, depth, is_maximazing):
         color = self.color if is_maximazing else self.player_color
-        all_moves = self.board.all_valid_moves(color)
         bestMove = -9999
-        bestMoveFound = None, None
+        bestMoveFound = None
 
-        for f_pos, squares in all_moves.items():
-            for square in squares:
-                new_pos = square.pos
-                value = self.board.virtual_move([f_pos, new_pos], self.minimax, depth - 1, -10000, 10000, not is_maximazing)
+        entry = self.tt.probe(position.hash)
+        moves = self.orderMoves(position, position.legal_moves(color), entry[3] if entry else None)
 
-                if (value >= bestMove):
+        if self.workers > 1 and depth > 1 and len(moves) > 1:
+            bestMove, bestMoveFound = self.parallelRoot(position, depth, moves)
+        else:
+            for move in moves:
+                position.make_move(move)
+                value = self.minimax(position, depth - 1, bestMove - ROOT_EPSILON, 10000, not is_maximazing)
+                position.unmake_move()
+
+                # при равенстве остается ход, стоящий раньше (хеш-ход, главный вариант)
+                if value > bestMove or bestMoveFound is None:
                     bestMove = value
-                    bestMoveFound = f_pos, new_pos
+                    bestMoveFound = move
 
-        return bestMoveFound;
+        if bestMoveFound is not None:
+            self.tt.store(position.hash, depth, bestMove, EXACT, bestMoveFound)
+        return bestMoveFound
 
-    def minimax (self, depth, alpha, beta, is_maximazing):
+    def parallelRoot(self, position, depth, moves):
+        """Первый ход ищется здесь, остальные раздаются пулу процессов (young brothers wait).
+        При равных оценках выбирается ход, стоящий раньше в порядке перебора."""
+        if self.pool is None:
+            self.sharedAlpha = multiprocessing.Value('d', -10000.0)
+            self.poolStop = multiprocessing.Value('b', 0)
+            self.pool = ProcessPoolExecutor(self.workers, initializer=_initSearchWorker,
+                                            initargs=(self.sharedAlpha, self.poolStop, self.color,
+                                                      Config.get().TT_SIZE_MB))
 
-        def on_moved():
-            if is_maximazing:
-                return  max(bestMove, self.minimax(depth - 1, alpha, beta, not is_maximazing))
+        position.make_move(moves[0])
+        value = self.minimax(position, depth - 1, -10000, 10000, False)
+        position.unmake_move()
+        results = [(value, 0, moves[0])]
+        self.sharedAlpha.value = value
+
+        deadline = None if self.deadline is None else time.time() + self.deadline - time.perf_counter()
+        self.poolStop.value = self.stopped
+        futures = [self.pool.submit(_searchRootMove, position, move, depth, self.pvMoves, deadline, self.tt.age)
+                   for move in moves[1:]]
+        timedOut = False
+        for i, (move, future) in enumerate(zip(moves[1:], futures), 1):
+            while not wait([future], timeout=0.05).done:
+                # жесткий лимит от ponderhit процессы пула узнают только через флаг остановки
+                self.applyPonderhit()
+                if self.deadline is not None and time.perf_counter() >= self.deadline:
+                    self.poolStop.value = 1
+            value, stats = future.result()
+            self.nodes += stats.nodes
+            self.stats.merge(stats)
+            if value is None:
+                timedOut = True
             else:
-                return  min(bestMove, self.minimax(depth - 1, alpha, beta, not is_maximazing))
+                results.append((value, -i, move))
+        if timedOut:
+            raise SearchTimeout()
+
+        value, _, move = max(results)
+        return value, move
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
 
+    def minimax (self, position, depth, alpha, beta, is_maximazing):
         color = self.color if is_maximazing else self.player_color
 
+        self.nodes += 1
+        if self.nodes % self.TIME_CHECK_NODES == 0:
+            self.checkTime()
+
+        stats = self.stats
+        if position.repetition_count() > 1:
+            # повторение на пути поиска - ничья, ветку дальше не смотрим
+            stats.repetitions += 1
+            return 0
         if depth == 0:
-            return -self.evaluateBoard()
+            return self.quiescence(position, alpha, beta, is_maximazing)
+
+        alphaOrig, betaOrig = alpha, beta
+        hashMove = None
+        stats.ttProbes += 1
+        entry = self.tt.probe(position.hash)
+        if entry is not None:
+            stats.ttHits += 1
+            ttDepth, ttScore, bound, hashMove = entry
+            if ttDepth >= depth:
+                if bound == EXACT:
+                    stats.ttCutoffs += 1
+                    return ttScore
+                elif bound == LOWER:
+                    alpha = max(alpha, ttScore)
+                elif bound == UPPER:
+                    beta = min(beta, ttScore)
+                if beta <= alpha:
+                    stats.ttCutoffs += 1
+                    return ttScore
+
+        moves = position.legal_moves(color)
+        if not moves:
+            # мат - проигрыш стороны, которой нечем ходить, пат - ничья
+            if position.is_in_check(color):
+                return -9999 if is_maximazing else 9999
+            return 0
 
         bestMove = -9999 if is_maximazing else 9999
+        bestMoveFound = None
+
+        ply = len(position.stack) - self.rootPly
+        for i, move in enumerate(self.orderMoves(position, moves, hashMove, ply)):
+            position.make_move(move)
+            value = self.minimax(position, depth - 1, alpha, beta, not is_maximazing)
+            position.unmake_move()
+
+            if is_maximazing:
+                if value > bestMove or bestMoveFound is None:
+                    bestMove, bestMoveFound = value, move
+                alpha = max(alpha, bestMove)
+            else:
+                if value < bestMove or bestMoveFound is None:
+                    bestMove, bestMoveFound = value, move
+                beta = min(beta, bestMove)
 
-        if not self.board.game_over():
-            all_moves = self.board.all_valid_moves(color)
-            for f_pos, squares in all_moves.items():
-                for square in squares:
-                        if is_maximazing:
-                            bestMove = self.board.virtual_move([f_pos, square.pos], on_moved)
-                            alpha = max(alpha, bestMove)
+            if (beta <= alpha):
+                stats.cutoffs += 1
+                if i == 0:
+                    stats.firstMoveCutoffs += 1
+                if position.squares[move >> 6] is None:
+                    # тихий ход, давший отсечение
+                    self.storeKiller(ply, move)
+                    self.history[move] = self.history.get(move, 0) + depth * depth
+                break
 
-                        else:
-                            bestMove = self.board.virtual_move([f_pos, square.pos], on_moved)
-                            beta = min(beta, bestMove)
+        if bestMove <= alphaOrig:
+            bound = UPPER
+        elif bestMove >= betaOrig:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.tt.store(position.hash, depth, bestMove, bound, bestMoveFound)
 
-                        if (beta <= alpha):
-                            return bestMove
+        return bestMove
+
+    def logStats(self, position):
+        """Дописывает статистику хода строкой JSON в Config.SEARCH_LOG."""
+        log = Config.get().SEARCH_LOG
+        if not log:
+            return
+        record = {'fen': position.fen(), 'color': self.color}
+        record.update(self.stats.asDict())
+        with (Path(__file__).parent / log).open('a') as fp:
+            fp.write(json.dumps(record) + '\n')
 
+    def quiescence(self, position, alpha, beta, is_maximazing):
+        """Форсированный поиск только по взятиям, чтобы не оценивать позицию
+        посреди размена. Без шаха сторона может не брать (stand pat); взятия,
+        которые даже с запасом DELTA_MARGIN не меняют alpha/beta, не ищутся."""
+        color = self.color if is_maximazing else self.player_color
+        stats = self.stats
+        stats.qnodes += 1
+
+        if position.is_in_check(color):
+            # под шахом оценка без хода ненадежна: перебираются все ответы
+            moves = position.legal_moves(color)
+            if not moves:
+                return -9999 if is_maximazing else 9999
+            standPat = None
+        else:
+            stats.evals += 1
+            standPat = -self.evaluateBoard(position)
+            if is_maximazing:
+                if standPat >= beta:
+                    return standPat
+                alpha = max(alpha, standPat)
+            else:
+                if standPat <= alpha:
+                    return standPat
+                beta = min(beta, standPat)
+            moves = position.legal_captures(color)
+
+        squares = position.squares
+        values = self.ORDER_VALUES
+
+        def score(move):
+            # MVV-LVA; ответы на шах без взятия - в конце
+            victim = squares[move >> 6]
+            if victim is None:
+                return 0
+            return values[victim.upper()] * 100 - values[squares[move & 63].upper()]
+
+        moves.sort(key=score, reverse=True)
+
+        bestMove = standPat if standPat is not None else (-9999 if is_maximazing else 9999)
+        for move in moves:
+            if standPat is not None:
+                gain = MATERIAL[squares[move >> 6].upper()] + self.DELTA_MARGIN
+                if is_maximazing and standPat + gain <= alpha or not is_maximazing and standPat - gain >= beta:
+                    continue
+
+            self.nodes += 1
+            if self.nodes % self.TIME_CHECK_NODES == 0:
+                self.checkTime()
+
+            position.make_move(move)
+            value = self.quiescence(position, alpha, beta, not is_maximazing)
+            position.unmake_move()
+
+            if is_maximazing:
+                bestMove = max(bestMove, value)
+                alpha = max(alpha, bestMove)
+            else:
+                bestMove = min(bestMove, value)
+                beta = min(beta, bestMove)
+            if beta <= alpha:
+                break
         return bestMove
 
-    def getBestMove(self, qres):
-        res = self.minimaxRoot(self.depth, True)
-        qres.put(res)
+    def ponderhit(self, soft, hard):
+        """Обдумывание на времени соперника стало поиском своего хода: с этого
+        момента на ход отводятся мягкий и жесткий лимиты. Вызывается из другого
+        потока, лимиты переносит в поиск applyPonderhit."""
+        with self.ponderLock:
+            self.ponderLimits = time.perf_counter(), soft, hard
+
+    def clearPonderhit(self):
+        with self.ponderLock:
+            self.ponderLimits = None
+
+    def applyPonderhit(self):
+        if self.ponderLimits is None:
+            return
+        with self.ponderLock:
+            if self.ponderLimits is None:
+                return
+            hit, soft, hard = self.ponderLimits
+            self.ponderLimits = None
+        self.softDeadline = hit + soft
+        self.deadline = hit + hard
+
+    def checkTime(self):
+        self.applyPonderhit()
+        if (self.stopped or self.sharedStop is not None and self.sharedStop.value
+                or self.deadline is not None and time.perf_counter() >= self.deadline):
+            raise SearchTimeout()
+
+    def stop(self):
+        self.stopped = True
+        if self.poolStop is not None:
+            self.poolStop.value = 1
+
+    def allocateTime(self, time_left, increment=0):
+        """Мягкий и жесткий лимиты на ход в секундах."""
+        soft = time_left / self.MOVES_TO_GO + increment
+        hard = min(soft * 4, time_left / 4)
+        return soft, hard
+
+    def timeLeft(self):
+        if self.board is None:
+            return None
+        timers = self.board.infopanel.timers
+        return (timers.white if self.color == 'w' else timers.black).total_seconds()
+
+    def principalVariation(self, position, depth):
+        pv = []
+        for _ in range(depth):
+            entry = self.tt.probe(position.hash)
+            if entry is None or entry[3] is None or entry[3] not in position.legal_moves():
+                break
+            pv.append(entry[3])
+            position.make_move(entry[3])
+        for _ in pv:
+            position.unmake_move()
+        return pv
+
+    def iterativeDeepening(self, position, time_left=None, increment=0, movetime=None):
+        """movetime - точное время на ход, иначе время делится из time_left."""
+        start = time.perf_counter()
+        self.deadline = self.softDeadline = None
+        if movetime is not None:
+            soft = hard = movetime
+        elif time_left is not None:
+            soft, hard = self.allocateTime(time_left, increment)
+        if movetime is not None or time_left is not None:
+            self.softDeadline = start + soft
+            self.deadline = start + hard
+
+        self.nodes = 0
+        self.depthNodes = []
+        self.stats = SearchStats()
+        self.pvMoves = {}
+        self.killers = []
+        # история прошлых ходов учитывается, но с меньшим весом
+        self.history = {move: value // 2 for move, value in self.history.items() if value > 1}
+        self.rootPly = len(position.stack)
+        bestMoveFound = None
+        for depth in range(1, self.depth + 1):
+            nodes = self.nodes
+            iterationStart = time.perf_counter()
+            try:
+                move = self.minimaxRoot(position, depth, True)
+            except SearchTimeout:
+                # незавершенная итерация отбрасывается, позиция возвращается в корень
+                while len(position.stack) > self.rootPly:
+                    position.unmake_move()
+                break
+            self.depthNodes.append(self.nodes - nodes)
+            if move is None:
+                break
+            bestMoveFound = move
+
+            pv = self.principalVariation(position, depth)
+            self.pvMoves = {}
+            for pvMove in pv:
+                self.pvMoves[position.hash] = pvMove
+                position.make_move(pvMove)
+            for _ in pv:
+                position.unmake_move()
+
+            score = self.tt.probe(position.hash)
+            self.stats.depths.append({
+                'depth': depth,
+                'nodes': self.depthNodes[-1],
+                'time': round(time.perf_counter() - iterationStart, 3),
+                'score': score[1] if score is not None else None,
+                'pv': [move_name(pvMove) for pvMove in pv],
+            })
+            if self.onIteration is not None:
+                self.onIteration(self.stats.depths[-1])
+            if score is not None and abs(score[1]) >= 9999:
+                # найден мат, глубже искать незачем
+                break
+            self.applyPonderhit()
+            if self.softDeadline is not None and time.perf_counter() >= self.softDeadline:
+                break
+
+        self.deadline = self.softDeadline = None
+        self.stats.nodes = self.nodes
+        return bestMoveFound
+
+    def getBestMove(self, qres=None, position=None, time_left=None, increment=0, movetime=None, infinite=False):
+        """Ход для позиции доски (или position). Время берется из часов доски,
+        если не задано time_left или movetime; infinite - без ограничения времени."""
+        # поиск идет по копии позиции, доска на экране не изменяется
+        position = self.board.position.copy() if position is None else position
+        if self.tt is None:
+            self.tt = TranspositionTable(Config.get().TT_SIZE_MB)
+        self.tt.new_search()
+
+        # в позициях из эндшпильных таблиц ход известен без поиска
+        start = time.perf_counter()
+        move = Tablebase.get().best_move(position)
+        if move is None:
+            if infinite:
+                time_left = None
+            elif time_left is None:
+                time_left = self.timeLeft()
+            move = self.iterativeDeepening(position, time_left, increment, movetime)
+        else:
+            self.stats = SearchStats()
+            self.stats.tablebase = True
+        self.stats.time = time.perf_counter() - start
+        self.stats.move = move_name(move) if move is not None else None
+        if self.stats.depths:
+            self.stats.score = self.stats.depths[-1]['score']
+            self.stats.pv = self.stats.depths[-1]['pv']
+        self.logStats(position)
+
+        res = (square_pos(move_from(move)), square_pos(move_to(move))) if move is not None else (None, None)
+        if qres is not None:
+            qres.put(res)
         return res
 
+
+if __name__ == '__main__':
+    import argparse
+    from position import Position
+
+    parser = argparse.ArgumentParser(description='Сравнение однопоточного и параллельного поиска')
+    parser.add_argument('fen', nargs='?', default=Config.get().START_POSITION)
+    parser.add_argument('--depth', type=int, default=Config.get().DIFFICULTY)
+    parser.add_argument('--workers', type=int, default=max(Config.get().SEARCH_WORKERS, multiprocessing.cpu_count()))
+    args = parser.parse_args()
+
+    times = {}
+    for workers in (1, args.workers):
+        position = Position(args.fen)
+        bot = Minimax(None, position.turn, args.depth)
+        bot.workers = workers
+        start = time.perf_counter()
+        move = bot.getBestMove(position=position)
+        times[workers] = time.perf_counter() - start
+        bot.close()
+        print(f'процессов {workers}: ход {move}, узлов {bot.nodes}, {times[workers]:.2f} с')
+    print(f'ускорение: {times[1] / times[args.workers]:.2f}')
@@ -1,10 +1,14 @@
 import pygame
+from pathlib import Path
 from config import Config
 from figures.Bishop import Bishop
 from figures.King import King
 from figures.Rook import Rook
 from resloader import ResLoader
 from infopanel import InfoPanel
+from history import GameHistory
+from position import Position, encode_move, move_from, move_to, square, square_pos
+from search import SearchController
 import bot
 
 
@@ -27,6 +31,8 @@ class Square:
         self._figure = None
         self.coord = self.get_coord()
         self.highlight, self.check, self.checkmate = False, False, False
+        # состояние клетки при последней отрисовке
+        self._drawn = None
 
         self.rect = pygame.Rect(self.abs_x, self.abs_y, self.width, self.height)
 
@@ -46,8 +52,13 @@ class Square:
     def figure(self):
         return self._figure
 
-    def draw(self):
-        pygame.draw.rect(self.screen, self.draw_color, self.rect)
+    def state(self):
+        return str(self._figure) if self._figure else None, self.highlight, self.check, self.checkmate
+
+    def changed(self):
+        return self.state() != self._drawn
+
+    def draw_overlay(self):
         if self.highlight:
             pygame.draw.circle(self.screen, self.board.HIGHLIGHT_COLOR, self.rect.center, self.width // 3, 5)
 
@@ -57,10 +68,23 @@ class Square:
         if self.checkmate:
             pygame.draw.rect(self.screen, self.board.CHECK_COLOR, self.rect)
 
-        if self.figure is not None:
-            centering_rect = self.figure.img.get_rect()
-            centering_rect.center = self.rect.center
-            self.screen.blit(self.figure.img, centering_rect.topleft)
+    def sprite(self):
+        """(атлас, позиция, область атласа) для Surface.blits или None, если клетка пустая."""
+        if self.figure is None:
+            return None
+        atlas, areas = self.board.sprites
+        area = areas[str(self.figure)]
+        return atlas, (self.rect.centerx - area.width // 2, self.rect.centery - area.height // 2), area
+
+    def draw(self):
+        self._drawn = self.state()
+        # клетка восстанавливается из заранее нарисованной доски
+        border = self.board.board_border
+        self.screen.blit(self.board.static_layer(), self.rect, self.rect.move(-border.left, -border.top))
+        self.draw_overlay()
+        sprite = self.sprite()
+        if sprite is not None:
+            self.screen.blit(*sprite)
 
 
 class Board:
@@ -69,46 +93,91 @@ class Board:
     LIGHT_COLOR = (224, 179, 133)
     CHECK_COLOR = (160, 10, 10)
     HIGHLIGHT_COLOR = (0, 128, 10)
+    PANEL_WIDTH = 200
+    # порядок спрайтов фигур в атласе
+    SPRITES = 'KRBkrb'
 
     def __init__(self, screen, width, height):
         self.width = width
         self.height = height
         self.screen = screen
-        self.panel_width = 200
+        self.panel_width = self.PANEL_WIDTH
         self.left_offset = (self.screen.get_width() - self.width) // 2
         self.top_offset = (self.screen.get_height() - self.height) // 2
         self.border_offset = 40
         self.tile_width = (width - self.panel_width) // 8
         self.tile_height = height // 8
         self.cfg = Config.get()
-        self.history = {}
+        self.position = Position()
+        self.history = GameHistory(self.cfg.START_POSITION)
+        # номер полухода текущей позиции в истории
+        self.ply = 0
         self.player_color = self.cfg.PLAYER_COLOR
         self.bot_color = self.invert(self.player_color)
         self.infopanel = InfoPanel(self)
         self.level = self.cfg.DIFFICULTY if self.cfg.DIFFICULTY > 0 else 1
         self.enemy_bot = bot.Minimax(self, self.bot_color, self.level)
         self.player_bot = bot.Minimax(self, self.invert(self.bot_color), self.level)
+        self.search = SearchController()
+        # неподвижная часть доски для каждого разворота и размера
+        self._layers = {}
+        self._sprites = None
 
     def new_game(self, fen=None):
+        # поиск бота для прежней позиции больше не нужен
+        self.search.cancel()
         self._game_result = 0
         self._message = ''
         self.selected_figure = None
-        self.turn = 'w'
-        self.without_attack = 0
-        self.moves = 1
+        self.undo_stack = []
 
         if fen is None:
-            self.history.clear()
             fen = self.cfg.START_POSITION
             self.infopanel.timers.reset()
 
         self.parse_fen(fen)
+        self.history.reset(fen)
+        self.ply = 0
 
-        self.history = {k:v for k, v in self.history.items() if k <= self.moves}
         self.squares = self.generate_squares()
         self.setup_board()
         self.is_in_game_over()
 
+    def goto(self, ply):
+        """Переход к позиции после ply полуходов партии: ходы отменяются или
+        доигрываются от текущей позиции либо от ближайшей контрольной точки."""
+        self.search.cancel()
+        ply = max(0, min(ply, len(self.history)))
+        base, fen = self.history.checkpoint(ply)
+        # отменить можно только ходы, сделанные после последней перестановки фигур
+        first = self.ply - len(self.undo_stack)
+        if ply < first or abs(ply - self.ply) > ply - base:
+            self.parse_fen(fen)
+            self.undo_stack = []
+            self.ply = base
+            for sq in self.squares:
+                sq.set_figure(None)
+            self.setup_board()
+
+        while self.ply > ply:
+            self.unmake_move()
+            self.ply -= 1
+        while self.ply < ply:
+            move, _, _ = self.history.move(self.ply)
+            self.make_move(square_pos(move_from(move)), square_pos(move_to(move)))
+            self.ply += 1
+        # после parse_fen в счетчике только контрольная точка; по хешам истории он
+        # одинаков, отменялись ходы или позиция доиграна от контрольной точки
+        self.position.repetitions = self.history.repetitions(ply)
+
+        self._game_result = 0
+        self._message = ''
+        self.selected_figure = None
+        self.clear_highlight(True)
+        for sq in self.squares:
+            sq.checkmate = False
+        self.is_in_game_over()
+
     def save_game(self):
         self.cfg.START_POSITION = self.generate_fen()
         self.cfg.save_config()
@@ -128,11 +197,15 @@ class Board:
                 self._message = f'Время черных вышло!'
             elif self._game_result == -3:
                 self._message = f'Время белых вышло!'
+            elif abs(self._game_result) == 4:
+                self._message = f'Ничья: троекратное повторение!'
             return True
 
     def is_in_game_over(self):
         if self.without_attack > 50:
             self.game_over(1)
+        elif self.position.is_repetition():
+            self.game_over(4)
         else:
             self.game_over(self.is_in_checkmate('b') or -self.is_in_checkmate('w'))
 
@@ -141,15 +214,24 @@ class Board:
         else:
             return ''
 
+    @property
+    def turn(self):
+        return self.position.turn
+
+    @property
+    def without_attack(self):
+        return self.position.without_attack
+
+    @property
+    def moves(self):
+        return self.position.moves
+
     def change_side(self):
+        # очередь хода и счетчики уже обновлены в Position.make_move
         self.update_history(self.clicked_square.pos)
 
-        if self.turn == 'b':
-            self.moves += 1
-
         self.clear_highlight(True)
         self.selected_figure = None
-        self.turn = self.invert(self.turn)
 
     def invert(self, color):
         return 'w' if color == 'b' else 'b'
@@ -158,12 +240,7 @@ class Board:
         return ('abcdefgh'.index(pos[0]), int(pos[1]) - 1)
 
     def parse_fen(self, fen):
-        params = fen.split()
-        self.position = params[0]
-        if len(params) > 1:
-            self.turn = params[1]
-            self.without_attack = int(params[2])
-            self.moves = int(params[3])
+        self.position.set_fen(fen)
 
     def generate_squares(self):
         square = []
@@ -190,53 +267,19 @@ class Board:
                 return [i for i in self.squares if i.figure is not None]
 
     def setup_board(self):
-        for y, row in enumerate(self.position.split('/')[:8]):
-            x = 0
-            irow = iter(row)
-            while x < 8:
-                figure = next(irow, '')
-                square = self((x, y))
-                if figure.isdigit():
-                    x += int(figure)
-                else:
-                    color = 'b' if figure in 'rbk' else 'w'
-                    if figure in 'Rr':
-                        square.set_figure(Rook((x, y), color, self))
-
-                    elif figure in 'Bb':
-                        square.set_figure(Bishop((x, y), color, self))
-
-                    elif figure in 'Kk':
-                        square.set_figure(King((x, y), color, self))
-
-                    x += 1
-#                     print(f"figure: {square.figure} {square.figure.pos}.")
+        figures = {'R': Rook, 'B': Bishop, 'K': King}
+        for sq, piece in self.position.pieces():
+            pos = square_pos(sq)
+            color = 'b' if piece.islower() else 'w'
+            self(pos).set_figure(figures[piece.upper()](pos, color, self))
 
     def generate_fen(self):
-        fen = []
-        for y in range(8):
-            row = ''
-            skip = 0
-            for x in range(8):
-                figure = self((x, y)).figure
-                if figure is not None:
-                    if skip > 0:
-                        row += str(skip)
-                        skip = 0
-                    row += str(figure)
-                else:
-                    skip += 1
-
-            if skip > 0:
-                row += str(skip)
-            fen.append(row)
-        return '/'.join(fen) + f" {self.invert(self.turn)} {self.without_attack} {self.moves}"
+        return self.position.fen()
 
     def update_history(self, to_pos):
-        move = self.history.setdefault(self.moves, {})
-        move[self.turn] = str(self.selected_figure) + f'{self((to_pos)).coord}'
-        move[f"{self.turn}fen"] = self.generate_fen()
-        print(move)
+        self.history.record(self.ply, self.position)
+        print(f'{self.moves - (self.turn == "w")}. {self.history.label(self.ply)}')
+        self.ply += 1
 
     def clear_highlight(self, clear_check=False):
         for i in self.squares:
@@ -264,40 +307,25 @@ class Board:
                 if not self.selected_figure is None:
                     return self.selected_figure.move(self.clicked_square)
 
-    def virtual_move(self, from_to, on_moved, *args):  # from_to = [(x1, y1), (x2, y2)]
-        changes = {pos:self(pos).figure for pos in from_to}
+    def make_move(self, from_pos, to_pos):
+        figure = self(from_pos).figure
+        self.undo_stack.append((figure, self(to_pos).figure, figure.has_moved))
 
-        self(from_to[1]).set_figure(self(from_to[0]).figure)
-        self(from_to[0]).set_figure(None)
-        try:
-            if callable(on_moved):
-                return on_moved(*args)
+        self.position.make_move(encode_move(square(from_pos), square(to_pos)))
+        self(to_pos).set_figure(figure)
+        self(from_pos).set_figure(None)
+        figure.has_moved = True
 
-        finally:
-            for pos, figure in changes.items():
-                self(pos).set_figure(figure)
+    def unmake_move(self):
+        figure, captured, has_moved = self.undo_stack.pop()
+        move = self.position.unmake_move()
 
-    def is_in_check(self, color, from_to=None):  # from_to = [(x1, y1), (x2, y2)]
-
-        def on_moved():
-            kings = self.find_squares_by_figure(color, 'K')
-            if kings:
-                for enemy_squares in self.find_squares_by_figure(self.invert(color)):
-                    for square in enemy_squares.figure.attacking_squares():
-                        if square.pos == kings[0].pos:
-                            return True
-
-        if from_to is not None:
-            return self.virtual_move(from_to, on_moved)
-        else:
-            return on_moved()
+        self(square_pos(move_from(move))).set_figure(figure)
+        self(square_pos(move_to(move))).set_figure(captured)
+        figure.has_moved = has_moved
 
-    def all_valid_moves(self, color):
-        return {s.figure.pos: s.figure.get_valid_moves() for s in self.find_squares_by_figure(color)}
-
-    def is_valid_moves_exists(self, color):
-        if any(self.all_valid_moves(color).values()):
-            return True
+    def is_in_check(self, color):
+        return self.position.is_in_check(color)
 
     def is_in_checkmate(self, color):
         result = 0
@@ -305,46 +333,110 @@ class Board:
         kings = self.find_squares_by_figure(color, 'K')
         if not kings:
             return 2
-        if not self.is_valid_moves_exists(color):
-            if self.is_in_check(color):
-                result = 2
-                kings[0].checkmate = True
-            elif self.turn == color:
-                result = 1
+        if self.position.is_checkmate(color):
+            result = 2
+            kings[0].checkmate = True
+        elif self.turn == color and self.position.is_stalemate(color):
+            result = 1
         elif self.is_in_check(color):
             kings[0].check = True
 
         return result
 
-    def draw(self):
-        tiles_border = pygame.Rect(self.left_offset, self.top_offset, self.tile_width * 8, self.tile_height * 8)
-        board_border = pygame.Rect(self.left_offset - self.border_offset, self.top_offset - self.border_offset, self.width - self.panel_width + 80, self.height + 80)
-        pygame.draw.rect(self.screen, self.LIGHT_COLOR, board_border)
+    def update_highlight(self):
+        if self.selected_figure is not None:
+            self(self.selected_figure.pos).highlight = True
+            for square in self.selected_figure.get_valid_moves():
+                square.highlight = True
+
+    @property
+    def tiles_border(self):
+        return pygame.Rect(self.left_offset, self.top_offset, self.tile_width * 8, self.tile_height * 8)
+
+    @property
+    def board_border(self):
+        return pygame.Rect(self.left_offset - self.border_offset, self.top_offset - self.border_offset, self.width - self.panel_width + 80, self.height + 80)
+
+    @classmethod
+    def sprite_paths(cls):
+        resources = Path(__file__).parent / 'resources'
+        return [resources / f"{'w' if f.isupper() else 'b'}_{f.lower()}.png" for f in cls.SPRITES]
+
+    @classmethod
+    def sprite_size(cls, width, height):
+        """Размер спрайта фигуры на доске width x height (вместе с панелью)."""
+        return (width - cls.PANEL_WIDTH) // 8 - 20, height // 8 - 20
+
+    @property
+    def sprites(self):
+        """Атлас спрайтов фигур и области в нем по обозначению фигуры."""
+        if self._sprites is None:
+            atlas, areas = ResLoader.get_instance().get_atlas(self.sprite_paths(), *self.sprite_size(self.width, self.height))
+            self._sprites = atlas, dict(zip(self.SPRITES, areas))
+        return self._sprites
+
+    def static_layer(self):
+        """Рамка, клетки и подписи доски, нарисованные один раз в отдельную поверхность."""
+        key = (self.player_color, self.width, self.height)
+        layer = self._layers.get(key)
+        if layer is not None:
+            return layer
+
+        board_border = self.board_border
+        layer = pygame.Surface(board_border.size).convert()
+        # координаты слоя отсчитываются от левого верхнего угла рамки
+        dx, dy = -board_border.left, -board_border.top
+        tiles_border = self.tiles_border.move(dx, dy)
+        layer.fill(self.LIGHT_COLOR)
 
         rl = ResLoader.get_instance()
         for i, c in enumerate('abcdefgh', 1):
             text = rl.create_text(c, ['Arial'], 20, color=self.DARK_COLOR)
-            self.screen.blit(text, (tiles_border.left + i * self.tile_width - (self.tile_width + text.get_width()) // 2,
-                                tiles_border.bottom + text.get_height() // 4))
+            layer.blit(text, (tiles_border.left + i * self.tile_width - (self.tile_width + text.get_width()) // 2,
+                              tiles_border.bottom + text.get_height() // 4))
 
-            self.screen.blit(text, (tiles_border.left + i * self.tile_width - (self.tile_width + text.get_width()) // 2,
-                                tiles_border.top - self.border_offset + text.get_height() // 2))
+            layer.blit(text, (tiles_border.left + i * self.tile_width - (self.tile_width + text.get_width()) // 2,
+                              tiles_border.top - self.border_offset + text.get_height() // 2))
 
         for i, c in enumerate('87654321' if self.player_color == 'w' else '12345678', 1):
             text = rl.create_text(c, ['Arial'], 20, color=self.DARK_COLOR)
-            self.screen.blit(text, (tiles_border.left - self.border_offset + text.get_width() + 5,
-                                self.top_offset + i * self.tile_height - (self.tile_height + text.get_height()) // 2))
-            self.screen.blit(text, (tiles_border.right + text.get_width(),
-                                self.top_offset + i * self.tile_height - (self.tile_height + text.get_height()) // 2))
+            layer.blit(text, (tiles_border.left - self.border_offset + text.get_width() + 5,
+                              tiles_border.top + i * self.tile_height - (self.tile_height + text.get_height()) // 2))
+            layer.blit(text, (tiles_border.right + text.get_width(),
+                              tiles_border.top + i * self.tile_height - (self.tile_height + text.get_height()) // 2))
 
         for square in self.squares:
-            square.draw()
+            pygame.draw.rect(layer, square.draw_color, square.rect.move(dx, dy))
 
-        if self.selected_figure is not None:
-            self(self.selected_figure.pos).highlight = True
-            for square in self.selected_figure.get_valid_moves():
-                square.highlight = True
+        pygame.draw.rect(layer, self.DARK_COLOR, board_border.move(dx, dy), width=5)
+        pygame.draw.rect(layer, self.DARK_COLOR, tiles_border, width=5)
+        self._layers[key] = layer
+        return layer
 
-        pygame.draw.rect(self.screen, self.DARK_COLOR, board_border, width=5)
-        pygame.draw.rect(self.screen, self.DARK_COLOR, tiles_border, width=5)
+    def draw_changed(self):
+        """Перерисовывает клетки, состояние которых изменилось; возвращает их прямоугольники."""
+        self.update_highlight()
+        rects = []
+        for square in self.squares:
+            if square.changed():
+                square.draw()
+                rects.append(square.rect)
+        if rects:
+            # отметки шаха и мата закрывают рамку поля на крайних клетках
+            pygame.draw.rect(self.screen, self.DARK_COLOR, self.tiles_border, width=5)
+        return rects
 
+    def draw(self):
+        self.update_highlight()
+        self.screen.blit(self.static_layer(), self.board_border)
+
+        sprites = []
+        for square in self.squares:
+            square._drawn = square.state()
+            square.draw_overlay()
+            sprite = square.sprite()
+            if sprite is not None:
+                sprites.append(sprite)
+        self.screen.blits(sprites, doreturn=False)
+
+        pygame.draw.rect(self.screen, self.DARK_COLOR, self.tiles_border, width=5)
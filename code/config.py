@@ -19,6 +19,20 @@ class Config:
         self.ENEMY_IS_PLAYER = False
         self.DIFFICULTY = 4
         self.TIME_LIMIT = 15
+        # размер таблицы транспозиций бота, МБ (не больше ttable.MAX_SIZE_MB)
+        self.TT_SIZE_MB = 16
+        # число процессов для поиска бота (1 - поиск в одном потоке)
+        self.SEARCH_WORKERS = 1
+        # каталог эндшпильных таблиц (относительно каталога программы)
+        self.TABLEBASE_DIR = 'tablebases'
+        # файл весов эндшпильной оценки (относительно каталога программы),
+        # если его нет - используются evaluation.WEIGHTS
+        self.EVAL_WEIGHTS = 'eval_weights.json'
+        # файл, в который бот пишет статистику поиска по строке на ход
+        # (относительно каталога программы), пустая строка - не писать
+        self.SEARCH_LOG = ''
+        # обдумывать ожидаемый ответ, пока ходит человек
+        self.PONDER = True
 
         self.__load_config()
 
@@ -0,0 +1,134 @@
+# Оценка позиции: материал и таблицы положения фигур (с точки зрения белых,
+# для черных таблица отражается по вертикали).
+
+import json
+from array import array
+from pathlib import Path
+
+from bitboard import bishop_attacks, lsb, popcount, rook_attacks, squares
+
+MATERIAL = {'R': 50, 'B': 33, 'K': 900}
+
+BISHOP_EVAL = [
+    [ -2.0, -1.0, -1.0, -1.0, -1.0, -1.0, -1.0, -2.0],
+    [ -1.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, -1.0],
+    [ -1.0, 0.0, 0.5, 1.0, 1.0, 0.5, 0.0, -1.0],
+    [ -1.0, 0.5, 0.5, 1.0, 1.0, 0.5, 0.5, -1.0],
+    [ -1.0, 0.0, 1.0, 1.0, 1.0, 1.0, 0.0, -1.0],
+    [ -1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, -1.0],
+    [ -1.0, 0.5, 0.0, 0.0, 0.0, 0.0, 0.5, -1.0],
+    [ -2.0, -1.0, -1.0, -1.0, -1.0, -1.0, -1.0, -2.0]
+]
+
+ROOK_EVAL = [
+    [  0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+    [  0.5, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 0.5],
+    [ -0.5, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, -0.5],
+    [ -0.5, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, -0.5],
+    [ -0.5, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, -0.5],
+    [ -0.5, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, -0.5],
+    [ -0.5, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, -0.5],
+    [  0.0, 0.0, 0.0, 0.5, 0.5, 0.0, 0.0, 0.0]
+]
+
+KING_EVAL = [
+    [ -3.0, -4.0, -4.0, -5.0, -5.0, -4.0, -4.0, -3.0],
+    [ -3.0, -4.0, -4.0, -5.0, -5.0, -4.0, -4.0, -3.0],
+    [ -3.0, -4.0, -4.0, -5.0, -5.0, -4.0, -4.0, -3.0],
+    [ -3.0, -4.0, -4.0, -5.0, -5.0, -4.0, -4.0, -3.0],
+    [ -2.0, -3.0, -3.0, -4.0, -4.0, -3.0, -3.0, -2.0],
+    [ -1.0, -2.0, -2.0, -2.0, -2.0, -2.0, -2.0, -1.0],
+    [  2.0, 2.0, 0.0, 0.0, 0.0, 0.0, 2.0, 2.0],
+    [  2.0, 3.0, 1.0, 0.0, 0.0, 1.0, 3.0, 2.0]
+]
+
+TABLES = {'R': ROOK_EVAL, 'B': BISHOP_EVAL, 'K': KING_EVAL}
+
+
+def _pst(piece):
+    table = TABLES[piece.upper()]
+    values = array('d', [0.0] * 64)
+    for sq in range(64):
+        x, y = sq % 8, sq // 8
+        if piece.isupper():
+            values[sq] = MATERIAL[piece] + table[y][x]
+        else:
+            values[sq] = -(MATERIAL[piece.upper()] + table[7 - y][x])
+    return values
+
+
+# PST[фигура][клетка] - вклад фигуры в оценку, плюс в пользу белых
+PST = {piece: _pst(piece) for piece in 'KRBkrb'}
+
+
+def full_score(position):
+    """Оценка пересчетом всех фигур; должна совпадать с position.score."""
+    return sum(PST[piece][sq] for sq, piece in position.pieces())
+
+
+# веса эндшпильных членов оценки; файл Config.EVAL_WEIGHTS переопределяет их
+WEIGHTS = {
+    # за шаг короля слабейшей стороны от центра к краю
+    'king_edge': 3.0,
+    # за сближение королей
+    'king_proximity': 2.0,
+    # за клетку, атакованную парой слонов
+    'bishop_control': 0.3,
+    # за клетку, доступную ладье
+    'rook_mobility': 0.3,
+}
+
+# расстояние клетки до центра: 0 в центре, 3 на краю доски
+CENTER_DISTANCE = array('b', [max(abs(2 * (sq % 8) - 7), abs(2 * (sq // 8) - 7)) // 2 for sq in range(64)])
+
+
+def distance(a, b):
+    return max(abs(a % 8 - b % 8), abs(a // 8 - b // 8))
+
+
+def load_weights(path=None):
+    weights = dict(WEIGHTS)
+    if path is not None and Path(path).is_file():
+        with Path(path).open('r') as fp:
+            weights.update(json.load(fp))
+    return weights
+
+
+class EndgameEvaluator:
+    """Оценка для KBB против KR и меньшего материала: вместо таблиц короля
+    сильнейшая сторона получает бонус за прижатие чужого короля к краю и
+    сближение королей, пара слонов - за контроль клеток, ладья - за подвижность."""
+
+    def __init__(self, weights=None):
+        self.weights = dict(WEIGHTS) if weights is None else weights
+
+    def evaluate(self, position):
+        """Оценка в пользу белых."""
+        bitboards = position.bitboards
+        white_king, black_king = bitboards['K'], bitboards['k']
+        white = MATERIAL['R'] * popcount(bitboards['R']) + MATERIAL['B'] * popcount(bitboards['B'])
+        black = MATERIAL['R'] * popcount(bitboards['r']) + MATERIAL['B'] * popcount(bitboards['b'])
+        if not white_king or not black_king or white == black:
+            return position.score
+
+        weights = self.weights
+        white_king, black_king = lsb(white_king), lsb(black_king)
+        score = position.score - PST['K'][white_king] - PST['k'][black_king]
+
+        weak_king = black_king if white > black else white_king
+        bonus = (weights['king_edge'] * CENTER_DISTANCE[weak_king]
+                 + weights['king_proximity'] * (7 - distance(white_king, black_king)))
+        score += bonus if white > black else -bonus
+
+        occupied = position.occupied
+        for bishop, rook, sign in (('B', 'R', 1), ('b', 'r', -1)):
+            bishops = bitboards[bishop]
+            if bishops & (bishops - 1):
+                control = 0
+                for sq in squares(bishops):
+                    control |= bishop_attacks(sq, occupied)
+                score += sign * weights['bishop_control'] * popcount(control)
+            own = position.colors['w' if sign > 0 else 'b']
+            for sq in squares(bitboards[rook]):
+                score += sign * weights['rook_mobility'] * popcount(rook_attacks(sq, occupied) & ~own)
+        return score
@@ -0,0 +1,129 @@
+# Окно игры на pygame. Модуль импортируется после окон входа и выбора
+# противника (в фоне, см. startup.py), чтобы они открывались без задержки.
+
+import pygame
+from chessboard import Board
+from pathlib import Path
+from renderer import Renderer
+from resloader import ResLoader
+
+RESOURCES = Path(__file__).parent / "resources"
+# размер доски вместе с панелью
+BOARD_SIZE = (800, 600)
+
+
+def assets(screen_size):
+    """Изображения (путь, ширина, высота) и звуки, нужные для первого кадра и ходов."""
+    images = [(RESOURCES / "background.jpg", *screen_size)]
+    images += [(path, *Board.sprite_size(*BOARD_SIZE)) for path in Board.sprite_paths()]
+    return images, [RESOURCES / "sound.mp3"]
+
+
+class Chess():
+
+    def __init__(self):
+        pygame.init()
+        pygame.display.set_caption('Шахматы')
+
+        self.screen = pygame.display.set_mode((int(800 * pygame.display.get_desktop_sizes()[0][0]
+                                                   / pygame.display.get_desktop_sizes()[0][1]), 800))
+        pygame.display.toggle_fullscreen()
+        self.clock = pygame.time.Clock()
+
+        self.board = Board(self.screen, *BOARD_SIZE)
+        self.board.new_game()
+        self.resources = ResLoader.get_instance()
+        self.renderer = Renderer(self.screen, self.board, self.background)
+
+        self.running = False
+
+    def background(self):
+        return self.resources.getImage(RESOURCES / "background.jpg", *pygame.display.get_desktop_sizes()[0])
+
+    def draw(self, events):
+        # на экран выводятся только изменившиеся области
+        self.renderer.draw(events, self.board.search.thinking())
+
+    def bot_move(self, bot):
+        # поиск идет в фоне; результат для другой позиции контроллер отбрасывает
+        self.board.search.start(bot, self.board.position)
+        res = self.board.search.poll(self.board.position)
+        if res is not None:
+            f, t = res
+            print(f"Поиск бота: {bot.stats}")
+            if f and t:
+                self.board.selected_figure = self.board(f).figure
+                self.board.clicked_square = self.board(t)
+                pygame.time.wait(250)
+
+                return self.board.selected_figure.move(self.board.clicked_square)
+
+    def human_turn(self):
+        if self.board.turn == self.board.bot_color:
+            return self.board.cfg.ENEMY_IS_PLAYER
+        return not self.board.cfg.PLAYER_IS_BOT
+
+    def player_move(self, events):
+        for event in events:
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                # нажата кнопка мыши
+                if event.button == 1:
+                    return self.board.on_click(*pygame.mouse.get_pos())
+
+    def start_game(self):
+        self.running = True
+        while self.running:
+            res = False
+            bot = None
+            events = pygame.event.get()
+            self.draw(events)
+
+            if not self.board.game_over():
+                if self.board.turn == self.board.bot_color:
+                    # ход соперника
+                    if self.board.cfg.ENEMY_IS_PLAYER:
+                        res = self.player_move(events)
+                    else:
+                        bot = self.board.enemy_bot
+                        res = self.bot_move(bot)
+                else:
+                    # ход игрока
+                    if self.board.cfg.PLAYER_IS_BOT:
+                        bot = self.board.player_bot
+                        res = self.bot_move(bot)
+                    else:
+                        res = self.player_move(events)
+
+                self.board.infopanel.timers.update(self.board.turn, self.clock.get_time())
+
+                if res:
+                    self.resources.play_sound(RESOURCES / "sound.mp3")
+                    print(f"Оценка позиции игрока = ", self.board.enemy_bot.evaluateBoard())
+
+                    self.board.change_side()
+                    print(self.board.is_in_game_over())
+
+                    if bot is not None and self.board.cfg.PONDER and not self.board.game_over() and self.human_turn():
+                        # пока думает человек, бот обдумывает ожидаемый ответ
+                        self.board.search.ponder(bot, self.board.position)
+
+            for event in events:
+                # Выход
+                if event.type == pygame.QUIT:
+                    self.running = False
+                elif event.type == pygame.MOUSEBUTTONDOWN:
+                    # нажата кнопка мыши
+                    if event.button == 1:
+                        self.board.infopanel.on_click(*pygame.mouse.get_pos())
+
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_ESCAPE:
+                        self.running = False  # Закрытие игры на Esc
+
+            self.clock.tick(30)
+        self.board.search.cancel()
+        self.board.enemy_bot.close()
+        self.board.player_bot.close()
+        print(f'Кадров: {self.renderer.frames}, без изменений (не выводились): {self.renderer.skipped}')
+        print('Кэши ресурсов:', self.resources.stats())
+        pygame.quit()  # Завершаем Pygame при выходе
@@ -0,0 +1,91 @@
+# История партии в компактном виде: начальная позиция, ходы по 4 байта
+# (откуда, куда, какая фигура ходила и какую взяла), хеши позиций по 8 байт
+# для счетчика повторений и контрольные точки - FEN через каждые
+# CHECKPOINT_PLIES полуходов, от которых восстанавливается любая позиция партии.
+
+from array import array
+
+from position import Position, square_name
+
+# код фигуры в записи хода, 0 - нет фигуры
+PIECE_CODES = ' KRBkrb'
+
+
+def pack_move(move, piece, captured):
+    return move | PIECE_CODES.index(piece) << 12 | PIECE_CODES.index(captured or ' ') << 15
+
+
+def unpack_move(record):
+    """(ход from | to << 6, фигура, взятая фигура или None)."""
+    captured = PIECE_CODES[record >> 15 & 7]
+    return record & 0xFFF, PIECE_CODES[record >> 12 & 7], captured if captured != ' ' else None
+
+
+class GameHistory:
+
+    CHECKPOINT_PLIES = 32
+
+    def __init__(self, fen):
+        self.reset(fen)
+
+    def __len__(self):
+        return len(self.moves)
+
+    def reset(self, fen):
+        position = Position(fen)
+        self.first_turn = position.turn
+        self.first_move = position.moves
+        self.moves = array('I')
+        # hashes[i] - хеш позиции после i полуходов
+        self.hashes = array('Q', [position.hash])
+        # checkpoints[i] - позиция после i * CHECKPOINT_PLIES полуходов
+        self.checkpoints = [position.fen()]
+
+    def record(self, ply, position):
+        """Записывает последний сделанный в position ход как полуход номер ply.
+        Если раньше с этой позиции был сделан другой ход, продолжение истории отбрасывается."""
+        move, captured = position.stack[-1][:2]
+        record = pack_move(move, position.squares[move >> 6], captured)
+        if ply < len(self.moves) and self.moves[ply] == record:
+            return
+        del self.moves[ply:]
+        del self.hashes[ply + 1:]
+        del self.checkpoints[ply // self.CHECKPOINT_PLIES + 1:]
+        self.moves.append(record)
+        self.hashes.append(position.hash)
+        if (ply + 1) % self.CHECKPOINT_PLIES == 0:
+            self.checkpoints.append(position.fen())
+
+    def move(self, ply):
+        return unpack_move(self.moves[ply])
+
+    def checkpoint(self, ply):
+        """Ближайшая контрольная точка не позже ply: (номер полухода, FEN)."""
+        index = min(ply // self.CHECKPOINT_PLIES, len(self.checkpoints) - 1)
+        return index * self.CHECKPOINT_PLIES, self.checkpoints[index]
+
+    def repetitions(self, ply):
+        """Счетчик повторений Position.repetitions для позиции после ply полуходов."""
+        counts = {}
+        for key in self.hashes[:ply + 1]:
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def label(self, ply):
+        """Запись полухода для панели: фигура и поле, например 'Rg1'."""
+        move, piece, _ = self.move(ply)
+        return piece + square_name(move >> 6)
+
+    def rows(self):
+        """Строки таблицы ходов: (номер хода, полуход белых, полуход черных),
+        полуход None - клетка пустая."""
+        rows = []
+        ply = 0
+        number = self.first_move
+        if self.first_turn == 'b' and self.moves:
+            rows.append((number, None, 0))
+            ply, number = 1, number + 1
+        while ply < len(self.moves):
+            rows.append((number, ply, ply + 1 if ply + 1 < len(self.moves) else None))
+            ply, number = ply + 2, number + 1
+        return rows
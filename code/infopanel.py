@@ -39,6 +39,9 @@ class Timers():
         elif self.black.total_seconds() <= 0:
             self.board.game_over(3)
 
+    def rects(self):
+        return [self.w_rect, self.b_rect]
+
     def _conv(self, td):
         seconds = int(td.total_seconds())
         hours = seconds // 3600
@@ -85,36 +88,41 @@ class InfoPanel:
         self.timers = Timers(self.board, self.bottom, self.board.cfg.TIME_LIMIT)
         self.bottom += self.timers.height()
         self.history_height = 0
+        # строки таблицы ходов на экране: (верх, низ, полуход белых, полуход черных)
+        self.history_rows = []
 
     def draw_history(self):
         rl = ResLoader.get_instance()
         y = self.bottom + 10
-        for m, h in list(self.board.history.items())[-41:]:
-            h['y'] = y
+        history = self.board.history
+        self.history_rows = []
+        for m, w, b in history.rows()[-41:]:
             m_text = rl.create_text(f"{m}.", ['Arial'], 16, color=self.board.DARK_COLOR, bold=True)
-            self.screen.blit(m_text, (self.panel.left + 10, h['y']))
+            self.screen.blit(m_text, (self.panel.left + 10, y))
 
-            if 'w' in h:
-                w_text = rl.create_text(f"{h['w']}", ['Arial'], 16, color=self.board.DARK_COLOR, bold=True)
-                self.screen.blit(w_text, (self.panel.centerx - self.width // 4 - w_text.get_width() // 2, h['y']))
+            if w is not None:
+                w_text = rl.create_text(history.label(w), ['Arial'], 16, color=self.board.DARK_COLOR, bold=True)
+                self.screen.blit(w_text, (self.panel.centerx - self.width // 4 - w_text.get_width() // 2, y))
 
-            if 'b' in h:
-                b_text = rl.create_text(f"{h['b']}", ['Arial'], 16, color=self.board.DARK_COLOR, bold=True)
-                self.screen.blit(b_text, (self.panel.centerx + self.width // 4 - b_text.get_width() // 2, h['y']))
+            if b is not None:
+                b_text = rl.create_text(history.label(b), ['Arial'], 16, color=self.board.DARK_COLOR, bold=True)
+                self.screen.blit(b_text, (self.panel.centerx + self.width // 4 - b_text.get_width() // 2, y))
+            self.history_rows.append((y, y + m_text.get_height(), w, b))
             y += m_text.get_height()
 
         self.history_height = y
 
     def on_click(self, mx, my):
-        for h in self.board.history.values():
-            if abs(my - h.get('y', 0)) <= 15:
+        # переход к позиции после выбранного полухода
+        for top, bottom, w, b in self.history_rows:
+            if top <= my < bottom:
                 if self.left < mx < self.panel.centerx:
-                    if 'wfen' in h:
-                        self.board.new_game(h['wfen'])
+                    if w is not None:
+                        self.board.goto(w + 1)
                         return
                 elif mx > self.panel.centerx:
-                    if 'bfen' in h:
-                        self.board.new_game(h['bfen'])
+                    if b is not None:
+                        self.board.goto(b + 1)
                         return
 
     def draw_message(self, text=None):
@@ -124,6 +132,27 @@ class InfoPanel:
             self.screen.blit(msg, (self.panel.centerx - msg.get_width() // 2,
                                     self.history_height))
 
+    def draw_frame(self, rect):
+        """Рамка панели в пределах rect: она лежит поверх кнопок и часов."""
+        self.screen.set_clip(rect)
+        pygame.draw.rect(self.screen, self.board.DARK_COLOR, self.panel, width=5)
+        self.screen.set_clip(None)
+
+    def draw_menu(self, events):
+        """Перерисовывает только кнопки меню; возвращает их прямоугольник."""
+        self.menu.draw(events)
+        rect = self.menu.rect()
+        self.draw_frame(rect)
+        return rect
+
+    def draw_timers(self):
+        """Перерисовывает только часы; возвращает их прямоугольники."""
+        self.timers.draw()
+        rects = self.timers.rects()
+        for rect in rects:
+            self.draw_frame(rect)
+        return rects
+
     def draw(self, events, bot_thread=False):
 
         if not bot_thread:
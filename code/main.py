@@ -1,20 +1,16 @@
-import pygame
-from chessboard import Board
-import threading
+from accounts import AccountStore
 from config import Config
 from tkinter import ttk, Tk, messagebox, StringVar
-import json
-from pathlib import Path
-from resloader import ResLoader
 import queue
-import bcrypt
+import threading
+from startup import Preloader, StartupTimer
 
 
 class SettingsWindow:
 
     def __init__(self):
         self.cfg = Config.get()
-        self._accounts_f = Path(__file__).with_name('accounts.json')
+        self.accounts = AccountStore()
 
         self.result = False
 
@@ -27,33 +23,76 @@ class SettingsWindow:
         y = (self.root.winfo_screenheight() // 2) - (height // 2)
         self.root.geometry(f"{width}x{height}+{x}+{y}")
 
+    def run_in_background(self, task, callback):
+        """Выполняет task в рабочем потоке; callback(результат) вызывается в потоке Tk.
+        Если task завершилась ошибкой, она показывается и callback получает None."""
+        results = queue.Queue()
+
+        def run():
+            try:
+                results.put((None, task()))
+            except Exception as e:
+                results.put((e, None))
+
+        def poll():
+            try:
+                error, result = results.get_nowait()
+            except queue.Empty:
+                self.root.after(20, poll)
+                return
+            if error is not None:
+                messagebox.showerror("Ошибка", str(error))
+            callback(result)
+
+        threading.Thread(target=run, daemon=True).start()
+        self.root.after(20, poll)
+
     def login(self):
 
+        def set_busy(busy):
+            """Блокирует кнопки, пока идет проверка или регистрация."""
+            login_btn.config(state='disabled' if busy else 'normal')
+            reg_btn.config(state='disabled' if busy or registered else 'normal')
+
         def enter():
             """Обрабатывает вход пользователя."""
-            if self._accounts_f.is_file() and user_var.get() and pass_var.get():
-                with self._accounts_f.open('r') as fp:
-                    acc = json.load(fp)
-                    stored_hash = acc.get(user_var.get())
-                    if stored_hash and bcrypt.checkpw(pass_var.get().encode(), stored_hash.encode()):
+            user, password = user_var.get(), pass_var.get()
+            if user and password:
+                def check():
+                    import bcrypt
+                    stored_hash = self.accounts.get_hash(user)
+                    return stored_hash is not None and bcrypt.checkpw(password.encode(), stored_hash.encode())
+
+                def done(ok):
+                    set_busy(False)
+                    if ok:
                         self.result = True
                         self.root.destroy()
-                    else:
+                    elif ok is not None:
                         messagebox.showerror("Ошибка", "Неверный логин или пароль.")
 
+                set_busy(True)
+                self.run_in_background(check, done)
+
         def registr():
             """Обрабатывает регистрацию пользователя."""
-            if user_var.get() and pass_var.get():
-                hashed_password = bcrypt.hashpw(pass_var.get().encode(), bcrypt.gensalt()).decode()
-                acc = {user_var.get(): hashed_password}
-                if self._accounts_f.is_file():
-                    with self._accounts_f.open('r') as fp:
-                        acc.update(json.load(fp))
-
-                with self._accounts_f.open('w') as fp:
-                    json.dump(acc, fp)
-                reg_btn.config(state='disabled')
-                messagebox.showinfo("Регистрация", "Регистрация успешна!")
+            user, password = user_var.get(), pass_var.get()
+            if user and password:
+                def add():
+                    import bcrypt
+                    return self.accounts.add(user, bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode())
+
+                def done(added):
+                    nonlocal registered
+                    registered = bool(added)
+                    set_busy(False)
+                    if added:
+                        messagebox.showinfo("Регистрация", "Регистрация успешна!")
+                    elif added is not None:
+                        messagebox.showerror("Ошибка", "Пользователь с таким логином уже есть.")
+
+                set_busy(True)
+                self.run_in_background(add, done)
 
         def on_closing():
             """Закрытие окна."""
@@ -62,6 +101,7 @@ class SettingsWindow:
 
         # Настройка окна
         self.result = False
+        registered = False
         self.root = Tk()
         self.root.title('Авторизация')
         self.root.resizable(False, False)
@@ -100,6 +140,9 @@ class SettingsWindow:
         # Центрируем окно
         self.center_window()
 
+        if self.accounts.migration_error:
+            self.root.after(0, lambda: messagebox.showerror("Ошибка", self.accounts.migration_error))
+
         return self
 
     def choose_enemy(self):
@@ -167,107 +210,26 @@ class SettingsWindow:
         return self.result
 
 
-class Chess():
-
-    def __init__(self):
-        pygame.init()
-        pygame.display.set_caption('Шахматы')
-
-        self.screen = pygame.display.set_mode((int(800 * pygame.display.get_desktop_sizes()[0][0]
-                                                   / pygame.display.get_desktop_sizes()[0][1]), 800))
-        pygame.display.toggle_fullscreen()
-        self.clock = pygame.time.Clock()
-
-        self.board = Board(self.screen, 800, 600)
-        self.board.new_game()
-        self.bot_thread = None
-        self.resources = ResLoader.get_instance()
-
-        self.running = False
-
-    def draw(self, events):
-        if self.bot_thread is None:
-            bkg = self.resources.getImage(Path(__file__).parent / "resources" / "background.jpg", *pygame.display.get_desktop_sizes()[0])
-            self.screen.blit(bkg, pygame.Rect(0, 0, *pygame.display.get_desktop_sizes()[0]))
-            self.board.draw()
-
-        self.board.infopanel.draw(events, self.bot_thread is not None)
-
-        pygame.display.update()
-
-    def bot_move(self, bot, qres):
-        if self.bot_thread is None:
-            self.bot_thread = threading.Thread(target=bot.getBestMove, args=[qres], daemon=True)
-            self.bot_thread.start()
-
-        if not qres.empty():
-            self.bot_thread = None
-            f, t = qres.get()
-            if f and t:
-                self.board.selected_figure = self.board(f).figure
-                self.board.clicked_square = self.board(t)
-                pygame.time.wait(250)
-
-                return self.board.selected_figure.move(self.board.clicked_square)
-
-    def player_move(self, events):
-        for event in events:
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                # нажата кнопка мыши
-                if event.button == 1:
-                    return self.board.on_click(*pygame.mouse.get_pos())
-
-    def start_game(self):
-        self.running = True
-        qres = queue.Queue(maxsize=1)
-        while self.running:
-            res = False
-            events = pygame.event.get()
-            self.draw(events)
-
-            if not self.board.game_over():
-                if self.board.turn == self.board.bot_color:
-                    # ход соперника
-                    if self.board.cfg.ENEMY_IS_PLAYER:
-                        res = self.player_move(events)
-                    else:
-                        res = self.bot_move(self.board.enemy_bot, qres)
-                else:
-                    # ход игрока
-                    if self.board.cfg.PLAYER_IS_BOT:
-                        res = self.bot_move(self.board.player_bot, qres)
-                    else:
-                        res = self.player_move(events)
-
-                self.board.infopanel.timers.update(self.board.turn, self.clock.get_time())
-
-                if res:
-                    self.resources.play_sound(Path(__file__).parent / "resources" / "sound.mp3")
-                    print(f"Оценка позиции игрока = ", self.board.enemy_bot.evaluateBoard())
-
-                    self.board.change_side()
-                    print(self.board.is_in_game_over())
-
-            for event in events:
-                # Выход
-                if event.type == pygame.QUIT:
-                    self.running = False
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    # нажата кнопка мыши
-                    if event.button == 1:
-                        self.board.infopanel.on_click(*pygame.mouse.get_pos())
-
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
-                        self.running = False  # Закрытие игры на Esc
-
-            self.clock.tick(30)
-        pygame.quit()  # Завершаем Pygame при выходе
-
-
 if __name__ == '__main__':
+    timer = StartupTimer()
     sw = SettingsWindow()
-    if sw.login().show():
-        sw.choose_enemy().show()
-        chess = Chess()
+    with timer.stage('окно входа'):
+        sw.login()
+        # пока открыто окно входа, в фоне импортируются pygame и игра и загружаются ресурсы
+        preloader = Preloader(timer, (sw.root.winfo_screenwidth(), sw.root.winfo_screenheight()))
+        preloader.start()
+        logged_in = sw.show()
+    if logged_in:
+        with timer.stage('выбор противника'):
+            sw.choose_enemy().show()
+        with timer.stage('ожидание загрузки'):
+            preloader.join()
+        if preloader.error is not None:
+            print('Ресурсы не загружены заранее:', preloader.error)
+        from game import Chess
+        with timer.stage('окно игры и доска'):
+            chess = Chess()
+        with timer.stage('первый кадр'):
+            chess.draw([])
+        print(timer.report())
         chess.start_game()
@@ -1,3 +1,4 @@
+import pygame
 import pygame_widgets
 from pygame_widgets.button import Button
 from resloader import ResLoader
@@ -20,6 +21,12 @@ class Menu:
     def height(self):
         return _widgets_[-1].getHeight()
 
+    def rect(self):
+        return pygame.Rect(self.board.left_offset + self.board.border_offset + self.board.width - self.width,
+                           self.board.top_offset - self.board.border_offset,
+                           self.width,
+                           self.height())
+
     def button_new_game(self):
 
         return Button(self.screen,
@@ -0,0 +1,366 @@
+# Позиция без зависимости от pygame: расстановка, FEN, генерация ходов,
+# шах/мат/пат и make/unmake. Клетка кодируется числом y * 8 + x, где
+# y = 0 - восьмая горизонталь (как в Board и в FEN).
+
+import random
+
+from bitboard import ATTACKS, BETWEEN, FULL, KING_ATTACKS, bishop_attacks, bit, lsb, rook_attacks, squares as bb_squares
+from evaluation import PST
+
+FILES = 'abcdefgh'
+PIECES = 'KRBkrb'
+COLOR_PIECES = {'w': 'KRB', 'b': 'krb'}
+
+
+def square(pos):
+    return pos[1] * 8 + pos[0]
+
+
+def square_pos(sq):
+    return sq % 8, sq // 8
+
+
+def square_name(sq):
+    return FILES[sq % 8] + str(8 - sq // 8)
+
+
+def parse_square(name):
+    return (8 - int(name[1])) * 8 + FILES.index(name[0])
+
+
+def color_of(piece):
+    return 'w' if piece.isupper() else 'b'
+
+
+def invert(color):
+    return 'w' if color == 'b' else 'b'
+
+
+# ключи Зобриста; генератор с фиксированным зерном, чтобы хеши совпадали
+# между процессами и запусками
+_zobrist_rng = random.Random(20240601)
+ZOBRIST = {piece: tuple(_zobrist_rng.getrandbits(64) for _ in range(64)) for piece in PIECES}
+ZOBRIST_TURN = _zobrist_rng.getrandbits(64)
+
+
+# ход кодируется одним числом: from | to << 6
+def encode_move(frm, to):
+    return frm | to << 6
+
+
+def move_from(move):
+    return move & 63
+
+
+def move_to(move):
+    return move >> 6
+
+
+def move_name(move):
+    return square_name(move & 63) + square_name(move >> 6)
+
+
+def parse_move(name):
+    """Ход в координатной записи ('a1b2') в число."""
+    return parse_square(name[:2]) | parse_square(name[2:4]) << 6
+
+
+class Position:
+
+    def __init__(self, fen=None):
+        self.clear()
+        self.turn = 'w'
+        self.without_attack = 0
+        self.moves = 1
+        if fen is not None:
+            self.set_fen(fen)
+
+    def __str__(self):
+        return self.fen()
+
+    def clear(self):
+        self.squares = [None] * 64
+        self.bitboards = dict.fromkeys(PIECES, 0)
+        self.colors = {'w': 0, 'b': 0}
+        self.occupied = 0
+        self.hash = 0
+        # материал и положение фигур в пользу белых, обновляется в put/remove
+        self.score = 0.0
+        # стек отмены: (ход, взятая фигура, without_attack, moves, turn)
+        self.stack = []
+        # сколько раз встречалась каждая позиция партии {хеш: число}; позиции до
+        # взятия повториться не могут, поэтому хватает одного счетчика на хеш
+        self.repetitions = {}
+
+    def copy(self):
+        other = Position()
+        other.squares = self.squares[:]
+        other.bitboards = self.bitboards.copy()
+        other.colors = self.colors.copy()
+        other.occupied = self.occupied
+        other.hash = self.hash
+        other.score = self.score
+        other.turn = self.turn
+        other.without_attack = self.without_attack
+        other.moves = self.moves
+        other.stack = self.stack[:]
+        other.repetitions = self.repetitions.copy()
+        return other
+
+    def put(self, sq, piece):
+        b = bit(sq)
+        self.squares[sq] = piece
+        self.bitboards[piece] |= b
+        self.colors[color_of(piece)] |= b
+        self.occupied |= b
+        self.hash ^= ZOBRIST[piece][sq]
+        self.score += PST[piece][sq]
+
+    def remove(self, sq):
+        piece = self.squares[sq]
+        b = bit(sq)
+        self.squares[sq] = None
+        self.bitboards[piece] ^= b
+        self.colors[color_of(piece)] ^= b
+        self.occupied ^= b
+        self.hash ^= ZOBRIST[piece][sq]
+        self.score -= PST[piece][sq]
+        return piece
+
+    def set_fen(self, fen):
+        params = fen.split()
+        self.clear()
+        for y, row in enumerate(params[0].split('/')[:8]):
+            x = 0
+            for char in row:
+                if x > 7:
+                    break
+                if char.isdigit():
+                    x += int(char)
+                elif char in PIECES:
+                    self.put(y * 8 + x, char)
+                    x += 1
+                else:
+                    raise ValueError(f'Неизвестная фигура {char!r} в FEN: {fen}')
+
+        self.turn = params[1] if len(params) > 1 else 'w'
+        if self.turn == 'b':
+            self.hash ^= ZOBRIST_TURN
+        if len(params) >= 6:
+            # стандартный FEN: рокировки и взятие на проходе не используются
+            self.without_attack, self.moves = int(params[4]), int(params[5])
+        elif len(params) >= 4:
+            self.without_attack, self.moves = int(params[2]), int(params[3])
+        if self.is_in_check(invert(self.turn)):
+            # иначе первым же ходом можно взять короля
+            raise ValueError(f'Король стороны, которая не ходит, под шахом: {fen}')
+        self.repetitions = {self.hash: 1}
+
+    def placement(self):
+        rows = []
+        for y in range(8):
+            row = ''
+            skip = 0
+            for piece in self.squares[y * 8:y * 8 + 8]:
+                if piece is None:
+                    skip += 1
+                else:
+                    if skip:
+                        row += str(skip)
+                        skip = 0
+                    row += piece
+            if skip:
+                row += str(skip)
+            rows.append(row)
+        return '/'.join(rows)
+
+    def fen(self):
+        return f'{self.placement()} {self.turn} {self.without_attack} {self.moves}'
+
+    def pieces(self, color=None, notation=None):
+        return [(sq, piece) for sq, piece in enumerate(self.squares)
+                if piece is not None
+                and (color is None or color_of(piece) == color)
+                and (notation is None or piece.upper() == notation)]
+
+    def king_square(self, color):
+        king = self.bitboards['K' if color == 'w' else 'k']
+        return lsb(king) if king else None
+
+    def is_attacked(self, sq, by_color):
+        king, rook, bishop = COLOR_PIECES[by_color]
+        bitboards = self.bitboards
+        return bool(KING_ATTACKS[sq] & bitboards[king]
+                    or rook_attacks(sq, self.occupied) & bitboards[rook]
+                    or bishop_attacks(sq, self.occupied) & bitboards[bishop])
+
+    def is_in_check(self, color=None):
+        color = self.turn if color is None else color
+        king = self.king_square(color)
+        return king is not None and self.is_attacked(king, invert(color))
+
+    def gives_check(self, move):
+        """Объявляет ли ход шах (прямой или вскрытый), без выполнения хода."""
+        frm, to = move & 63, move >> 6
+        piece = self.squares[frm]
+        king_sq = self.king_square('b' if piece.isupper() else 'w')
+        if king_sq is None:
+            return False
+        king, rook, bishop = COLOR_PIECES[color_of(piece)]
+        occupied = self.occupied & ~bit(frm) | bit(to)
+        rooks, bishops = self.bitboards[rook], self.bitboards[bishop]
+        if piece == rook:
+            rooks ^= bit(frm) | bit(to)
+        elif piece == bishop:
+            bishops ^= bit(frm) | bit(to)
+        return bool(rook_attacks(king_sq, occupied) & rooks or bishop_attacks(king_sq, occupied) & bishops)
+
+    def pseudo_legal_moves(self, color=None):
+        color = self.turn if color is None else color
+        own = self.colors[color]
+        occupied = self.occupied
+        moves = []
+        for piece in COLOR_PIECES[color]:
+            attacks = ATTACKS[piece.upper()]
+            for frm in bb_squares(self.bitboards[piece]):
+                for to in bb_squares(attacks(frm, occupied) & ~own):
+                    moves.append(frm | to << 6)
+        return moves
+
+    def attack_map(self, color, occupied=None):
+        """Все клетки, атакованные фигурами цвета color."""
+        occupied = self.occupied if occupied is None else occupied
+        king, rook, bishop = COLOR_PIECES[color]
+        bitboards = self.bitboards
+        attacked = 0
+        for sq in bb_squares(bitboards[king]):
+            attacked |= KING_ATTACKS[sq]
+        for sq in bb_squares(bitboards[rook]):
+            attacked |= rook_attacks(sq, occupied)
+        for sq in bb_squares(bitboards[bishop]):
+            attacked |= bishop_attacks(sq, occupied)
+        return attacked
+
+    def checkers_and_pins(self, color):
+        """Фигуры, объявившие шах королю color, и связанные фигуры color
+        в виде словаря {клетка связанной фигуры: допустимые клетки}."""
+        king_sq = self.king_square(color)
+        enemy = invert(color)
+        king, rook, bishop = COLOR_PIECES[enemy]
+        bitboards = self.bitboards
+        own = self.colors[color]
+
+        checkers = (KING_ATTACKS[king_sq] & bitboards[king]
+                    | rook_attacks(king_sq, self.occupied) & bitboards[rook]
+                    | bishop_attacks(king_sq, self.occupied) & bitboards[bishop])
+
+        # дальнобойные фигуры, которые видят короля сквозь его собственные фигуры
+        pins = {}
+        enemy_occupied = self.colors[enemy]
+        snipers = (rook_attacks(king_sq, enemy_occupied) & bitboards[rook]
+                   | bishop_attacks(king_sq, enemy_occupied) & bitboards[bishop])
+        for sniper in bb_squares(snipers):
+            between = BETWEEN[king_sq][sniper]
+            blockers = between & self.occupied
+            if blockers and blockers & (blockers - 1) == 0 and blockers & own:
+                pins[lsb(blockers)] = between | bit(sniper)
+        return checkers, pins
+
+    def iter_legal_moves(self, color=None, mask=FULL):
+        """Легальные ходы за один проход по карте атак соперника;
+        mask ограничивает клетки, на которые ходят фигуры."""
+        color = self.turn if color is None else color
+        king_sq = self.king_square(color)
+        if king_sq is None:
+            yield from (move for move in self.pseudo_legal_moves(color) if bit(move >> 6) & mask)
+            return
+
+        own = self.colors[color]
+        occupied = self.occupied
+        # король не должен прятаться за собой от дальнобойной фигуры
+        attacked = self.attack_map(invert(color), occupied ^ bit(king_sq))
+        for to in bb_squares(KING_ATTACKS[king_sq] & ~own & ~attacked & mask):
+            yield king_sq | to << 6
+
+        checkers, pins = self.checkers_and_pins(color)
+        if checkers & (checkers - 1):
+            # двойной шах: ходит только король
+            return
+        if checkers:
+            checker = lsb(checkers)
+            allowed = checkers | BETWEEN[king_sq][checker]
+        else:
+            allowed = FULL
+        allowed &= mask
+
+        king, rook, bishop = COLOR_PIECES[color]
+        for piece, attacks in ((rook, rook_attacks), (bishop, bishop_attacks)):
+            for frm in bb_squares(self.bitboards[piece]):
+                targets = attacks(frm, occupied) & ~own & allowed
+                if frm in pins:
+                    targets &= pins[frm]
+                for to in bb_squares(targets):
+                    yield frm | to << 6
+
+    def legal_moves(self, color=None):
+        return list(self.iter_legal_moves(color))
+
+    def legal_captures(self, color=None):
+        color = self.turn if color is None else color
+        return list(self.iter_legal_moves(color, self.colors[invert(color)]))
+
+    def legal_moves_from(self, sq):
+        piece = self.squares[sq]
+        if piece is None:
+            return []
+        return [move >> 6 for move in self.iter_legal_moves(color_of(piece)) if move & 63 == sq]
+
+    def has_legal_moves(self, color=None):
+        for _ in self.iter_legal_moves(color):
+            return True
+        return False
+
+    def is_checkmate(self, color=None):
+        return self.is_in_check(color) and not self.has_legal_moves(color)
+
+    def is_stalemate(self, color=None):
+        return not self.is_in_check(color) and not self.has_legal_moves(color)
+
+    def repetition_count(self):
+        """Сколько раз в партии встречалась текущая позиция (с той же очередью хода)."""
+        return self.repetitions.get(self.hash, 0)
+
+    def is_repetition(self, count=3):
+        return self.repetitions.get(self.hash, 0) >= count
+
+    def make_move(self, move):
+        frm, to = move & 63, move >> 6
+        captured = self.squares[to]
+        self.stack.append((move, captured, self.without_attack, self.moves, self.turn))
+
+        if captured is not None:
+            self.remove(to)
+        piece = self.remove(frm)
+        self.put(to, piece)
+
+        # число предыдущих ходов без взятий
+        self.without_attack = 0 if captured is not None else self.without_attack + 1
+        if piece.islower():
+            self.moves += 1
+        self.turn = 'w' if piece.islower() else 'b'
+        self.hash ^= ZOBRIST_TURN
+        self.repetitions[self.hash] = self.repetitions.get(self.hash, 0) + 1
+
+    def unmake_move(self):
+        count = self.repetitions[self.hash] - 1
+        if count:
+            self.repetitions[self.hash] = count
+        else:
+            del self.repetitions[self.hash]
+        move, captured, self.without_attack, self.moves, self.turn = self.stack.pop()
+        to = move >> 6
+        self.put(move & 63, self.remove(to))
+        if captured is not None:
+            self.put(to, captured)
+        self.hash ^= ZOBRIST_TURN
+        return move
@@ -0,0 +1,82 @@
+# Отрисовка кадра по измененным областям: клетки доски, у которых поменялись
+# фигура или отметки, часы, панель с историей и кнопки меню. На экран
+# выводятся только эти прямоугольники, кадр без изменений не выводится вовсе.
+
+import pygame
+
+# события, после которых окно нужно перерисовать целиком
+EXPOSE_EVENTS = (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED,
+                 pygame.WINDOWSIZECHANGED)
+MOUSE_EVENTS = (pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP)
+
+
+class Renderer:
+
+    def __init__(self, screen, board, background):
+        self.screen = screen
+        self.board = board
+        # функция, возвращающая фон окна
+        self.background = background
+        self.full = True
+        # клетки доски при последней отрисовке; новая партия создает их заново
+        self.squares = None
+        self.panel_state = None
+        self.timers_state = None
+        self.frames = 0
+        self.skipped = 0
+
+    def invalidate(self):
+        self.full = True
+
+    def panel_changed(self):
+        history = self.board.history
+        state = (len(history), history.moves[-1] if len(history) else None, self.board._message)
+        changed, self.panel_state = state != self.panel_state, state
+        return changed
+
+    def timers_changed(self):
+        timers = self.board.infopanel.timers
+        state = (timers.text('w'), timers.text('b'))
+        changed, self.timers_state = state != self.timers_state, state
+        return changed
+
+    def draw(self, events, thinking=False):
+        """Рисует кадр; возвращает True, если что-то выведено на экран."""
+        self.frames += 1
+        if any(event.type in EXPOSE_EVENTS for event in events):
+            self.invalidate()
+        if self.board.squares is not self.squares:
+            # после новой партии перерисовывается все окно, а не 64 клетки по отдельности
+            self.squares = self.board.squares
+            self.invalidate()
+        panel = self.board.infopanel
+
+        if self.full:
+            self.full = False
+            self.panel_changed()
+            self.timers_changed()
+            self.screen.blit(self.background(), (0, 0))
+            self.board.draw()
+            # панель рисуется полностью, но во время поиска кнопки не получают события
+            panel.draw([] if thinking else events)
+            pygame.display.update()
+            return True
+
+        dirty = self.board.draw_changed()
+        if not thinking and self.panel_changed():
+            # новая строка истории или сообщение: панель перерисовывается целиком
+            self.timers_changed()
+            panel.draw(events)
+            dirty.append(panel.panel)
+        else:
+            if not thinking and any(event.type in MOUSE_EVENTS for event in events):
+                # вид кнопок меняется только от мыши
+                dirty.append(panel.draw_menu(events))
+            if self.timers_changed():
+                dirty.extend(panel.draw_timers())
+
+        if not dirty:
+            self.skipped += 1
+            return False
+        pygame.display.update(dirty)
+        return True
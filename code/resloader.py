@@ -1,16 +1,70 @@
 import pygame
-from pathlib import Path
+from collections import OrderedDict
+
+
+def surface_size(surface):
+    return surface.get_pitch() * surface.get_height()
+
+
+class LRUCache:
+    """Кэш, вытесняющий давно не использованные записи при превышении
+    числа записей или суммарного размера в байтах."""
+
+    def __init__(self, max_entries, max_bytes=None, sizeof=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value):
+        size = self.sizeof(value) if self.sizeof is not None else 0
+        if key in self._entries:
+            self.bytes -= self._entries.pop(key)[1]
+        self._entries[key] = value, size
+        self.bytes += size
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or
+                                          self.max_bytes is not None and self.bytes > self.max_bytes):
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+            self.evictions += 1
+        return value
+
+    def stats(self):
+        return {'entries': len(self._entries), 'bytes': self.bytes, 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions}
 
 
 class ResLoader:
 
     __instance = None
 
+    # ограничения кэшей: (записей, байт)
+    TEXT_CACHE = (512, 4 << 20)
+    IMAGE_CACHE = (32, 64 << 20)
+    SOUND_CACHE = 8
+
     def __init__(self):
         self._cached_fonts = {}
-        self._cached_text = {}
-        self._cached_images = {}
-        self._cached_sounds = {}
+        self._cached_text = LRUCache(*self.TEXT_CACHE, sizeof=surface_size)
+        self._cached_images = LRUCache(*self.IMAGE_CACHE, sizeof=surface_size)
+        self._cached_sounds = LRUCache(self.SOUND_CACHE)
+        self._cached_atlases = {}
 
     @classmethod
     def get_instance(cls):
@@ -19,13 +73,27 @@ class ResLoader:
         return cls.__instance
 
     def getImage(self, path, w=None, h=None):
-        if Path(path).name in self._cached_images:
-            return self._cached_images.get(Path(path).name)
-        else:
+        # одно изображение может быть нужно в нескольких размерах
+        key = (str(path), w, h)
+        img = self._cached_images.get(key)
+        if img is None:
             img = pygame.image.load(path)
             if w is not None and h is not None:
                 img = pygame.transform.scale(img, (w, h))
-                return self._cached_images.setdefault(Path(path).name, img)
+            img = self._cached_images.put(key, img)
+        return img
+
+    def get_atlas(self, paths, w, h):
+        """Спрайты одного размера в одной поверхности: (атлас, [область каждого спрайта])."""
+        key = (tuple(map(str, paths)), w, h)
+        if key not in self._cached_atlases:
+            atlas = pygame.Surface((w * len(paths), h), pygame.SRCALPHA)
+            areas = []
+            for i, path in enumerate(paths):
+                atlas.blit(self.getImage(path, w, h), (i * w, 0))
+                areas.append(pygame.Rect(i * w, 0, w, h))
+            self._cached_atlases[key] = atlas.convert_alpha(), areas
+        return self._cached_atlases[key]
 
     def make_font(self, fonts, size, bold=False):
         available = pygame.font.get_fonts()
@@ -46,13 +114,23 @@ class ResLoader:
 
     def create_text(self, text, fonts, size, color, bold=False):
         key = '|'.join(map(str, (fonts, size, color, bold, text)))
-        image = self._cached_text.get(key, None)
+        image = self._cached_text.get(key)
         if image is None:
             font = self.get_font(fonts, size, bold)
-            image = font.render(text, True, color)
-            self._cached_text[key] = image
+            image = self._cached_text.put(key, font.render(text, True, color))
         return image
 
+    def get_sound(self, path):
+        sound = self._cached_sounds.get(str(path))
+        if sound is None:
+            sound = self._cached_sounds.put(str(path), pygame.mixer.Sound(path))
+        return sound
+
     def play_sound(self, path):
-        sound = self._cached_sounds.setdefault(path.name, pygame.mixer.Sound(path))
-        sound.play()
+        self.get_sound(path).play()
+
+    def stats(self):
+        """Счетчики кэшей текста, изображений и звуков."""
+        return {'text': self._cached_text.stats(),
+                'images': self._cached_images.stats(),
+                'sounds': self._cached_sounds.stats()}
@@ -0,0 +1,93 @@
+# Поиск бота в фоновом потоке: отмена, проверка того, что результат
+# относится к позиции на доске, и обдумывание ожидаемого ответа соперника
+# на его времени (ponder).
+
+import threading
+
+from position import parse_move
+
+
+def position_id(position):
+    """Позиция, для которой ищется ход: расстановка, очередь хода и счетчики."""
+    return position.hash, position.without_attack, position.moves
+
+
+class SearchController:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread = None
+        self.bot = None
+        # позиция текущего поиска; результат принимается, только если она совпадает
+        self.id = None
+        self.result = None
+        self.pondering = False
+
+    def _run(self, bot, position, id, infinite):
+        result = bot.getBestMove(position=position, infinite=infinite)
+        with self.lock:
+            if self.id == id:
+                self.result = result
+
+    def _start(self, bot, position, infinite):
+        self.cancel()
+        bot.stopped = False
+        bot.clearPonderhit()
+        with self.lock:
+            self.bot = bot
+            self.id = position_id(position)
+            self.result = None
+            self.pondering = infinite
+        self.thread = threading.Thread(target=self._run, args=(bot, position.copy(), self.id, infinite),
+                                       daemon=True)
+        self.thread.start()
+
+    def start(self, bot, position):
+        """Запускает поиск хода, если он еще не идет для этой позиции.
+        Если бот уже обдумывает эту позицию, поиск продолжается с лимитом времени."""
+        with self.lock:
+            if self.bot is bot and self.id == position_id(position):
+                if self.pondering:
+                    self.pondering = False
+                    time_left = bot.timeLeft()
+                    if time_left is not None:
+                        bot.ponderhit(*bot.allocateTime(time_left))
+                return
+        self._start(bot, position, False)
+
+    def ponder(self, bot, position):
+        """Обдумывает позицию после ожидаемого ответа из главного варианта бота."""
+        self.cancel()
+        pv = bot.stats.pv
+        if len(pv) < 2:
+            return
+        move = parse_move(pv[1])
+        if move not in position.legal_moves():
+            return
+        position = position.copy()
+        position.make_move(move)
+        self._start(bot, position, True)
+
+    def poll(self, position):
+        """Результат поиска ((x, y), (x, y)), если он готов и позиция не изменилась, иначе None."""
+        with self.lock:
+            if self.result is None or self.pondering or self.id != position_id(position):
+                return None
+            result, self.result, self.id = self.result, None, None
+        self.thread = None
+        return result
+
+    def thinking(self):
+        """Идет поиск хода (не обдумывание на времени соперника)."""
+        return self.thread is not None and not self.pondering
+
+    def cancel(self):
+        with self.lock:
+            self.id = None
+            self.result = None
+            self.pondering = False
+            bot, thread = self.bot, self.thread
+        if thread is not None:
+            bot.stop()
+            thread.join()
+            self.thread = None
@@ -0,0 +1,128 @@
+# Партии бота против самого себя без pygame, по партии на процесс пула.
+# Результаты пишутся в JSONL по мере окончания партий.
+#
+#   python selfplay.py --games 100 --depth 4 --workers 8 --output selfplay.jsonl
+#   python selfplay.py --games 20 --movetime 0.5 --positions benchmark.fen
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from benchmark import POSITIONS_FILE, load_positions
+from bot import Minimax
+from config import Config
+from position import Position, move_name
+from tablebase import is_insufficient, material
+
+
+def outcome(position):
+    """(результат, причина) или None, если партия продолжается; правила как в Board."""
+    for color, result in (('w', '0-1'), ('b', '1-0')):
+        if position.king_square(color) is None:
+            return result, 'король взят'
+    if not position.has_legal_moves():
+        if position.is_in_check():
+            return ('0-1' if position.turn == 'w' else '1-0'), 'мат'
+        return '1/2-1/2', 'пат'
+    if position.without_attack > 50:
+        return '1/2-1/2', '50 ходов без взятий'
+    if position.is_repetition():
+        return '1/2-1/2', 'троекратное повторение'
+    name, _ = material([piece for _, piece in position.pieces()])
+    if is_insufficient(name):
+        return '1/2-1/2', 'недостаточно материала'
+    return None
+
+
+def play_game(game, name, fen, depth, movetime, max_plies):
+    position = Position(fen)
+    bots = {color: Minimax(None, color, depth) for color in 'wb'}
+    for bot in bots.values():
+        # процессы пула уже заняты партиями, поиск каждой идет в одном процессе
+        bot.workers = 1
+
+    moves, times, nodes = [], [], []
+    start = time.perf_counter()
+    result = outcome(position)
+    while result is None and len(moves) < max_plies:
+        bot = bots[position.turn]
+        moveStart = time.perf_counter()
+        bot.getBestMove(position=position.copy(), movetime=movetime)
+        times.append(round(time.perf_counter() - moveStart, 3))
+        nodes.append(bot.stats.nodes)
+        if bot.stats.move is None:
+            break
+        moves.append(bot.stats.move)
+        position.make_move(next(move for move in position.legal_moves() if move_name(move) == bot.stats.move))
+        result = outcome(position)
+
+    result, reason = result if result is not None else ('1/2-1/2', 'лимит ходов')
+    return {
+        'game': game,
+        'name': name,
+        'fen': fen,
+        'result': result,
+        'reason': reason,
+        'plies': len(moves),
+        'time': round(time.perf_counter() - start, 3),
+        'moves': moves,
+        'times': times,
+        'nodes': nodes,
+        'final_fen': position.fen(),
+    }
+
+
+def run(positions, games, depth, movetime, max_plies, workers, output):
+    """Играет games партий по кругу из positions; возвращает сводку."""
+    summary = {'games': 0, 'results': {}, 'plies': 0, 'moves_time': 0.0}
+    legal = []
+    for name, fen, expected in positions:
+        try:
+            Position(fen)
+        except (ValueError, IndexError) as e:
+            print(f'позиция {name} пропущена: {e}')
+            continue
+        legal.append((name, fen, expected))
+    if not legal:
+        return summary
+    positions = legal
+    with ProcessPoolExecutor(workers) as pool, open(output, 'a') as fp:
+        futures = []
+        for game in range(games):
+            name, fen, _ = positions[game % len(positions)]
+            futures.append(pool.submit(play_game, game, name, fen, depth, movetime, max_plies))
+
+        for future in as_completed(futures):
+            record = future.result()
+            fp.write(json.dumps(record, ensure_ascii=False) + '\n')
+            fp.flush()
+            summary['games'] += 1
+            summary['results'][record['result']] = summary['results'].get(record['result'], 0) + 1
+            summary['plies'] += record['plies']
+            summary['moves_time'] += sum(record['times'])
+            print(f"партия {record['game']} ({record['name']}): {record['result']}, {record['reason']}, "
+                  f"{record['plies']} полуходов, {record['time']:.1f} с")
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Партии бота против самого себя')
+    parser.add_argument('--games', type=int, default=10)
+    parser.add_argument('--positions', default=str(POSITIONS_FILE), help='файл начальных позиций')
+    limit = parser.add_mutually_exclusive_group()
+    limit.add_argument('--depth', type=int, help='глубина поиска на ход')
+    limit.add_argument('--movetime', type=float, help='время на ход, с')
+    parser.add_argument('--max-plies', type=int, default=200, help='после этого числа полуходов - ничья')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--output', default='selfplay.jsonl')
+    args = parser.parse_args()
+
+    depth = args.depth or (64 if args.movetime else Config.get().DIFFICULTY)
+    summary = run(load_positions(args.positions), args.games, depth, args.movetime, args.max_plies,
+                  args.workers, args.output)
+    plies = summary['plies']
+    print(f"партий {summary['games']}: {summary['results']}, "
+          f"в среднем {plies / max(summary['games'], 1):.1f} полуходов, "
+          f"{summary['moves_time'] / max(plies, 1):.3f} с на ход")
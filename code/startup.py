@@ -0,0 +1,65 @@
+# Запуск игры: пока открыты окна входа и выбора противника, в фоновом потоке
+# импортируются pygame и модули игры, декодируются и масштабируются фон,
+# спрайты фигур и звук хода. После первого кадра печатается время этапов.
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupTimer:
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.lock = threading.Lock()
+        # (этап, секунды, выполнялся в фоне)
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name, background=False):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.stages.append((name, time.perf_counter() - start, background))
+
+    def report(self):
+        with self.lock:
+            stages = list(self.stages)
+        lines = ['Запуск:']
+        for name, seconds, background in stages:
+            lines.append(f"  {name}{' (в фоне)' if background else ''}: {seconds * 1000:.0f} мс")
+        lines.append(f'  до первого кадра: {(time.perf_counter() - self.start) * 1000:.0f} мс')
+        return '\n'.join(lines)
+
+
+class Preloader(threading.Thread):
+    """Фоновая загрузка модулей и ресурсов игры в кэши ResLoader."""
+
+    def __init__(self, timer, screen_size):
+        super().__init__(daemon=True)
+        self.timer = timer
+        self.screen_size = screen_size
+        # ошибка загрузки; ресурс, который не удалось загрузить, загрузится при первой отрисовке
+        self.error = None
+
+    def run(self):
+        try:
+            with self.timer.stage('импорт pygame', True):
+                import pygame
+            with self.timer.stage('импорт игры', True):
+                import game
+                from resloader import ResLoader
+
+            images, sounds = game.assets(self.screen_size)
+            rl = ResLoader.get_instance()
+            with self.timer.stage('изображения', True):
+                for path, w, h in images:
+                    rl.getImage(path, w, h)
+            with self.timer.stage('звуки', True):
+                pygame.mixer.init()
+                for path in sounds:
+                    rl.get_sound(path)
+        except Exception as e:
+            self.error = e
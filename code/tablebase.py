@@ -0,0 +1,623 @@
+# Эндшпильные таблицы для материала из двух сторон (например, KBBvKR).
+#
+# Значение позиции хранится одним байтом с точки зрения стороны, чья очередь хода:
+# 0 - ничья, 1..127 - выигрыш за n ходов (2n - 1 полуходов),
+# 128..254 - проигрыш через n ходов соперника (2n полуходов, 128 - мат), 255 - нелегальная позиция.
+# Позиции приводятся к одной из 8 симметрий доски так, чтобы белый король
+# стоял в треугольнике a8-a5-d5; одинаковые фигуры индексируются сочетанием клеток.
+
+import argparse
+import math
+import mmap
+import os
+import pickle
+import random
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from multiprocessing import shared_memory
+from pathlib import Path
+
+from bitboard import ATTACKS, squares as bb_squares
+from config import Config
+from position import Position, invert
+
+MAGIC = b'KBTB'
+VERSION = 1
+HEADER = struct.Struct('<4sB11sQ')
+CHECKPOINT_MAGIC = b'KBCK'
+CHECKPOINT_HEADER = struct.Struct('<4s11sQQ')
+DRAW, ILLEGAL = 0, 255
+MAX_PLIES = 253
+
+ORDER = 'KRB'
+VALUES = {'K': 0, 'R': 5, 'B': 3}
+
+
+def encode(plies):
+    return (plies + 1) // 2 if plies % 2 else 128 + plies // 2
+
+
+def decode(value):
+    """Число полуходов до мата (нечетное - выигрыш, четное - проигрыш) или None для ничьей."""
+    if value == DRAW or value == ILLEGAL:
+        return None
+    return 2 * value - 1 if value < 128 else 2 * (value - 128)
+
+
+def _transform(sq, t):
+    x, y = sq % 8, sq // 8
+    if t & 1:
+        x = 7 - x
+    if t & 2:
+        y = 7 - y
+    if t & 4:
+        x, y = y, x
+    return y * 8 + x
+
+
+TRANSFORMS = tuple(tuple(_transform(sq, t) for sq in range(64)) for t in range(8))
+TRIANGLE = tuple(y * 8 + x for y in range(4) for x in range(4) if x <= y)
+TRIANGLE_INDEX = {sq: i for i, sq in enumerate(TRIANGLE)}
+# для короля на диагонали a8-d5 подходят две симметрии
+KING_TRANSFORMS = tuple(tuple(TRANSFORMS[t] for t in range(8) if TRANSFORMS[t][sq] in TRIANGLE_INDEX) for sq in range(64))
+
+
+def _combination_index(squares):
+    return sum(math.comb(sq, i + 1) for i, sq in enumerate(sorted(squares)))
+
+
+_combinations = {}
+
+
+def _combination(index, count):
+    table = _combinations.get(count)
+    if table is None:
+        table = [None] * math.comb(64, count)
+        for combo in combinations(range(64), count):
+            table[_combination_index(combo)] = combo
+        _combinations[count] = table
+    return table[index]
+
+
+def side_name(pieces):
+    return ''.join(sorted((p.upper() for p in pieces), key=ORDER.index))
+
+
+def material(pieces):
+    """Каноническое имя таблицы для набора фигур и признак того,
+    что цвета нужно поменять местами."""
+    white = side_name(p for p in pieces if p.isupper())
+    black = side_name(p for p in pieces if p.islower())
+    strength = lambda side: (sum(VALUES[p] for p in side), len(side), side)
+    if strength(black) > strength(white):
+        return f'{black}v{white}', True
+    return f'{white}v{black}', False
+
+
+def is_insufficient(name):
+    # без ладьи и с одним слоном мат не поставить
+    return 'R' not in name and name.count('B') <= 1
+
+
+class Signature:
+
+    def __init__(self, name):
+        white, black = name.split('v')
+        if white[:1] != 'K' or black[:1] != 'K':
+            raise ValueError(f'Неверная сигнатура таблицы: {name}')
+        self.name = name
+        self.pieces = tuple(white + black.lower())
+        self.groups = []
+        for piece in self.pieces:
+            if self.groups and self.groups[-1][0] == piece:
+                self.groups[-1][1] += 1
+            else:
+                self.groups.append([piece, 1])
+        self.sizes = [len(TRIANGLE)] + [math.comb(64, count) for _, count in self.groups[1:]]
+        self.size = 2 * math.prod(self.sizes)
+
+    def __str__(self):
+        return self.name
+
+    def index(self, squares, turn):
+        # из двух симметричных записей берется меньший индекс, вторая остается нелегальной
+        return min(self._index(squares, turn, transform) for transform in KING_TRANSFORMS[squares[0]])
+
+    def _index(self, squares, turn, transform):
+        index = 0 if turn == 'w' else 1
+        start = 0
+        for g, ((piece, count), size) in enumerate(zip(self.groups, self.sizes)):
+            group = squares[start:start + count]
+            start += count
+            if g == 0:
+                sub = TRIANGLE_INDEX[transform[group[0]]]
+            elif count == 1:
+                sub = transform[group[0]]
+            else:
+                sub = _combination_index([transform[sq] for sq in group])
+            index = index * size + sub
+        return index
+
+    def squares(self, index):
+        subs = []
+        for size in reversed(self.sizes):
+            index, sub = divmod(index, size)
+            subs.append(sub)
+        subs.reverse()
+
+        squares = [TRIANGLE[subs[0]]]
+        for (piece, count), sub in zip(self.groups[1:], subs[1:]):
+            if count == 1:
+                squares.append(sub)
+            else:
+                squares.extend(_combination(sub, count))
+        return squares, 'w' if index == 0 else 'b'
+
+    def canonical(self, pieces, squares, turn):
+        """Приводит произвольный список фигур этой сигнатуры к порядку self.pieces."""
+        order = sorted(range(len(pieces)), key=lambda i: (pieces[i].islower(), ORDER.index(pieces[i].upper())))
+        return [squares[i] for i in order], turn
+
+
+class Tablebase:
+
+    __instance = None
+
+    @classmethod
+    def get(cls):
+        if cls.__instance is None:
+            cls.__instance = cls(Path(__file__).parent / Config.get().TABLEBASE_DIR)
+        return cls.__instance
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self._tables = {}
+
+    def path(self, name):
+        return self.directory / f'{name}.tb'
+
+    def table(self, name):
+        """Открывает файл таблицы через mmap; None, если таблицы нет."""
+        if name not in self._tables:
+            table = None
+            path = self.path(name)
+            if path.is_file():
+                with path.open('rb') as fp:
+                    table = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+                magic, version, signature, size = HEADER.unpack_from(table)
+                if magic != MAGIC or version != VERSION or signature.rstrip(b'\0').decode() != name:
+                    raise ValueError(f'{path} не является таблицей {name}')
+                table = Signature(name), table
+            self._tables[name] = table
+        return self._tables[name]
+
+    def close(self):
+        for table in self._tables.values():
+            if table is not None:
+                table[1].close()
+        self._tables.clear()
+
+    def probe_pieces(self, pieces, squares, turn):
+        """Байт значения для расстановки или None, если подходящей таблицы нет."""
+        name, flipped = material(pieces)
+        if is_insufficient(name):
+            return DRAW
+        if flipped:
+            pieces = [p.swapcase() for p in pieces]
+            squares = [sq ^ 56 for sq in squares]
+            turn = invert(turn)
+
+        table = self.table(name)
+        if table is None:
+            return None
+        signature, values = table
+        squares, turn = signature.canonical(pieces, squares, turn)
+        return values[HEADER.size + signature.index(squares, turn)]
+
+    def probe(self, position):
+        pieces = position.pieces()
+        return self.probe_pieces([p for _, p in pieces], [sq for sq, _ in pieces], position.turn)
+
+    def best_move(self, position):
+        """Лучший ход по таблицам: быстрейший мат, иначе ничья, иначе самое долгое сопротивление.
+        None, если хотя бы для одного хода нет таблицы."""
+        best, best_key = None, None
+        for move in position.legal_moves():
+            position.make_move(move)
+            value = self.probe(position)
+            position.unmake_move()
+            if value is None or value == ILLEGAL:
+                return None
+
+            plies = decode(value)
+            if plies is None:
+                key = 0
+            elif plies % 2 == 0:
+                # соперник проигрывает - чем быстрее, тем лучше
+                key = 1000 - plies
+            else:
+                key = plies - 1000
+            if best_key is None or key > best_key:
+                best, best_key = move, key
+        return best
+
+
+def take_flags(flags, chunk=1 << 20):
+    """Номера ненулевых байтов flags; сами флаги сбрасываются."""
+    result = []
+    for start in range(0, len(flags), chunk):
+        block = bytes(flags[start:start + chunk])
+        index = block.find(1)
+        if index < 0:
+            continue
+        while index >= 0:
+            result.append(start + index)
+            index = block.find(1, index + 1)
+        flags[start:start + len(block)] = bytes(len(block))
+    return result
+
+
+def has_flags(flags, chunk=1 << 20):
+    return any(bytes(flags[start:start + chunk]).find(1) >= 0 for start in range(0, len(flags), chunk))
+
+
+def merge_schedule(schedule, other):
+    for iteration, indices in other.items():
+        schedule.setdefault(iteration, []).extend(indices)
+
+
+class Generator:
+
+    def __init__(self, name, tablebase=None, log=print, values=None, pending=None):
+        self.signature = Signature(name)
+        self.tablebase = Tablebase.get() if tablebase is None else tablebase
+        self.log = log
+        self.position = Position()
+        # values и pending могут лежать в разделяемой памяти (см. ParallelGenerator)
+        self.values = bytearray(self.signature.size) if values is None else values
+        self.pending = bytearray(self.signature.size) if pending is None else pending
+        self.schedule = {}
+
+    def setup(self, squares, turn):
+        """Расставляет фигуры; False, если позиция нелегальна."""
+        if len(set(squares)) != len(squares):
+            return False
+        position = self.position
+        position.clear()
+        for piece, sq in zip(self.signature.pieces, squares):
+            position.put(sq, piece)
+        position.turn = turn
+        return not position.is_in_check(invert(turn))
+
+    def successor(self, squares, turn, move):
+        frm, to = move & 63, move >> 6
+        pieces = self.signature.pieces
+        squares = list(squares)
+        if to in squares:
+            captured = squares.index(to)
+            squares[squares.index(frm)] = to
+            del squares[captured]
+            value = self.tablebase.probe_pieces(pieces[:captured] + pieces[captured + 1:], squares, invert(turn))
+            if value is None:
+                raise FileNotFoundError(f'Нет таблицы для {material(pieces[:captured] + pieces[captured + 1:])[0]}')
+            return value
+        squares[squares.index(frm)] = to
+        return self.values[self.signature.index(squares, invert(turn))]
+
+    def check(self, index, iteration):
+        """Пытается определить значение позиции по уже известным значениям ходов.
+        True, если позиция решена на этой итерации."""
+        squares, turn = self.signature.squares(index)
+        self.setup(squares, turn)
+        moves = self.position.legal_moves()
+        if not moves:
+            if self.position.is_in_check():
+                self.values[index] = encode(0)
+                return True
+            # пат остается ничьей
+            return False
+
+        win, loss, all_wins = None, -1, True
+        for move in moves:
+            plies = decode(self.successor(squares, turn, move))
+            if plies is None:
+                all_wins = False
+            elif plies % 2 == 0:
+                win = plies + 1 if win is None else min(win, plies + 1)
+            else:
+                loss = max(loss, plies + 1)
+
+        if win is not None:
+            target = win
+        elif all_wins:
+            target = loss
+        else:
+            return False
+
+        if target > MAX_PLIES:
+            return False
+        if target <= iteration:
+            self.values[index] = encode(target)
+            return True
+        # результат через взятие известен заранее, но наступит на более поздней итерации
+        self.schedule.setdefault(target, []).append(index)
+        return False
+
+    def mark_predecessors(self, index):
+        """Помечает позиции, из которых тихим ходом получается index."""
+        signature = self.signature
+        squares, turn = signature.squares(index)
+        self.setup(squares, turn)
+        position = self.position
+        mover = invert(turn)
+        for i, (piece, sq) in enumerate(zip(signature.pieces, squares)):
+            if (piece.isupper()) != (mover == 'w'):
+                continue
+            for prev in bb_squares(ATTACKS[piece.upper()](sq, position.occupied) & ~position.occupied):
+                position.remove(sq)
+                position.put(prev, piece)
+                legal = not position.is_in_check(turn)
+                position.remove(prev)
+                position.put(sq, piece)
+                if legal:
+                    before = list(squares)
+                    before[i] = prev
+                    prev_index = signature.index(before, mover)
+                    if self.values[prev_index] == DRAW:
+                        self.pending[prev_index] = 1
+
+    def resolve_pass(self, indices, iteration):
+        resolved = []
+        for index in indices:
+            if self.values[index] == DRAW and self.check(index, iteration):
+                resolved.append(index)
+        for index in resolved:
+            self.mark_predecessors(index)
+        return len(resolved)
+
+    def initial_pass(self, start=0, stop=None):
+        resolved = []
+        stop = self.signature.size if stop is None else stop
+        for index in range(start, stop):
+            squares, turn = self.signature.squares(index)
+            if not self.setup(squares, turn) or self.signature.index(squares, turn) != index:
+                self.values[index] = ILLEGAL
+            elif self.check(index, 0):
+                resolved.append(index)
+        for index in resolved:
+            self.mark_predecessors(index)
+        return len(resolved)
+
+    def take_schedule(self):
+        schedule, self.schedule = self.schedule, {}
+        return schedule
+
+    def run_initial(self):
+        return self.initial_pass()
+
+    def run_iteration(self, indices, iteration):
+        return self.resolve_pass(indices, iteration)
+
+    def checkpoint_path(self):
+        return self.tablebase.path(self.signature.name).with_suffix('.ckpt')
+
+    def save_checkpoint(self, iteration):
+        path = self.checkpoint_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.ckpt.tmp')
+        with tmp.open('wb') as fp:
+            fp.write(CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, self.signature.name.encode(), self.signature.size, iteration))
+            fp.write(self.values)
+            fp.write(self.pending)
+            pickle.dump(self.schedule, fp)
+        tmp.replace(path)
+
+    def load_checkpoint(self):
+        """Номер последней сохраненной итерации или -1, если продолжать нечего."""
+        path = self.checkpoint_path()
+        if not path.is_file():
+            return -1
+        size = self.signature.size
+        with path.open('rb') as fp:
+            magic, name, stored, iteration = CHECKPOINT_HEADER.unpack(fp.read(CHECKPOINT_HEADER.size))
+            if magic != CHECKPOINT_MAGIC or name.rstrip(b'\0').decode() != self.signature.name or stored != size:
+                raise ValueError(f'{path} не является контрольной точкой {self.signature}')
+            self.values[:] = fp.read(size)
+            self.pending[:] = fp.read(size)
+            self.schedule = pickle.load(fp)
+        return iteration
+
+    def generate(self, resume=True):
+        start = time.perf_counter()
+        self.log(f'{self.signature}: {self.signature.size} позиций')
+        iteration = self.load_checkpoint() if resume else -1
+        if iteration < 0:
+            resolved = self.run_initial()
+            iteration = 0
+            self.save_checkpoint(iteration)
+            self.log(f'  итерация 0: матов {resolved}')
+        else:
+            self.log(f'  продолжение после итерации {iteration}')
+
+        while self.schedule or has_flags(self.pending):
+            iteration += 1
+            indices = take_flags(self.pending) + self.schedule.pop(iteration, [])
+            resolved = self.run_iteration(indices, iteration)
+            self.save_checkpoint(iteration)
+            self.log(f'  итерация {iteration}: проверено {len(indices)}, решено {resolved}')
+
+        self.log(f'{self.signature}: готово за {time.perf_counter() - start:.1f} с')
+        return self.values
+
+    def save(self, path=None):
+        path = self.tablebase.path(self.signature.name) if path is None else Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        with tmp.open('wb') as fp:
+            fp.write(HEADER.pack(MAGIC, VERSION, self.signature.name.encode(), self.signature.size))
+            fp.write(self.values)
+        tmp.replace(path)
+        self.checkpoint_path().unlink(missing_ok=True)
+        return path
+
+
+# состояние процесса пула: генератор поверх разделяемой памяти
+_worker = None
+
+
+def _init_worker(name, directory, values_name, pending_name):
+    global _worker
+    values = shared_memory.SharedMemory(values_name)
+    pending = shared_memory.SharedMemory(pending_name)
+    _worker = Generator(name, Tablebase(directory), log=None, values=values.buf, pending=pending.buf)
+    # ссылки на сегменты держим, пока жив процесс
+    _worker.shared = values, pending
+
+
+def _initial_task(start, stop):
+    return _worker.initial_pass(start, stop), _worker.take_schedule()
+
+
+def _resolve_task(indices, iteration):
+    return _worker.resolve_pass(indices, iteration), _worker.take_schedule()
+
+
+class ParallelGenerator(Generator):
+    """Генератор, раздающий итерации пулу процессов. Значения и флаги лежат
+    в разделяемой памяти: каждый процесс пишет значения только своих позиций,
+    а флаги предшественников (всегда 1) - куда угодно."""
+
+    def __init__(self, name, tablebase=None, log=print, workers=None):
+        signature = Signature(name)
+        self.workers = workers or os.cpu_count()
+        self._values = shared_memory.SharedMemory(create=True, size=signature.size)
+        self._pending = shared_memory.SharedMemory(create=True, size=signature.size)
+        super().__init__(name, tablebase, log, self._values.buf, self._pending.buf)
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                        initargs=(name, self.tablebase.directory, self._values.name, self._pending.name))
+
+    def close(self):
+        self.pool.shutdown()
+        self.values = self.pending = None
+        for shm in (self._values, self._pending):
+            shm.close()
+            shm.unlink()
+
+    def chunks(self, items):
+        # несколько частей на процесс, чтобы выровнять нагрузку
+        count = self.workers * 8
+        size = max(1, -(-len(items) // count))
+        return [items[i:i + size] for i in range(0, len(items), size)]
+
+    def run(self, task, jobs):
+        resolved = 0
+        for count, schedule in self.pool.map(task, *zip(*jobs)) if jobs else ():
+            resolved += count
+            merge_schedule(self.schedule, schedule)
+        return resolved
+
+    def run_initial(self):
+        # непрерывные срезы индекса; старшие разряды индекса - очередь хода и белый король
+        size = self.signature.size
+        step = -(-size // (self.workers * 8))
+        return self.run(_initial_task, [(start, min(start + step, size)) for start in range(0, size, step)])
+
+    def run_iteration(self, indices, iteration):
+        return self.run(_resolve_task, [(chunk, iteration) for chunk in self.chunks(indices)])
+
+
+def subsignatures(name):
+    """Таблицы, в которые ведут взятия из таблицы name."""
+    white, black = name.split('v')
+    result = set()
+    for side, other, flip in ((white, black, False), (black, white, True)):
+        for i in range(1, len(side)):
+            rest = side[:i] + side[i + 1:]
+            pieces = list(rest + other.lower()) if not flip else list(other + rest.lower())
+            sub, _ = material(pieces)
+            if not is_insufficient(sub):
+                result.add(sub)
+    return sorted(result)
+
+
+def generate(name, tablebase=None, log=print, workers=1, resume=True):
+    """Строит таблицу name и все нужные ей таблицы с меньшим материалом."""
+    tablebase = Tablebase.get() if tablebase is None else tablebase
+    for sub in subsignatures(name):
+        if not tablebase.path(sub).is_file():
+            generate(sub, tablebase, log, workers, resume)
+
+    if workers > 1:
+        generator = ParallelGenerator(name, tablebase, log, workers)
+        try:
+            generator.generate(resume)
+            return generator.save()
+        finally:
+            generator.close()
+    generator = Generator(name, tablebase, log)
+    generator.generate(resume)
+    return generator.save()
+
+
+def verify(name, samples=1000, tablebase=None, seed=0):
+    """Сверяет таблицу с генератором ходов Position: позиция строится через FEN,
+    а ее значение должно следовать из значений после каждого легального хода.
+    Возвращает число расхождений."""
+    tablebase = Tablebase.get() if tablebase is None else tablebase
+    signature, values = tablebase.table(name)
+    rng = random.Random(seed)
+    errors = 0
+    for _ in range(samples):
+        index = rng.randrange(signature.size)
+        value = values[HEADER.size + index]
+        if value == ILLEGAL:
+            continue
+        squares, turn = signature.squares(index)
+        position = Position()
+        for piece, sq in zip(signature.pieces, squares):
+            position.put(sq, piece)
+        position.turn = turn
+        position = Position(position.fen())
+
+        win, loss, all_wins = None, -1, True
+        moves = position.legal_moves()
+        for move in moves:
+            position.make_move(move)
+            plies = decode(tablebase.probe(position))
+            position.unmake_move()
+            if plies is None:
+                all_wins = False
+            elif plies % 2 == 0:
+                win = plies + 1 if win is None else min(win, plies + 1)
+            else:
+                loss = max(loss, plies + 1)
+
+        if not moves:
+            expected = encode(0) if position.is_in_check() else DRAW
+        elif win is not None:
+            expected = encode(win)
+        elif all_wins:
+            expected = encode(loss)
+        else:
+            expected = DRAW
+        if expected != value:
+            errors += 1
+    return errors
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Генерация эндшпильных таблиц')
+    parser.add_argument('signature', nargs='?', default='KBBvKR')
+    parser.add_argument('--dir', help='каталог с таблицами')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='число процессов')
+    parser.add_argument('--restart', action='store_true', help='не продолжать с контрольной точки')
+    parser.add_argument('--verify', type=int, metavar='N', help='только проверить N случайных позиций таблицы')
+    args = parser.parse_args()
+
+    tb = Tablebase(args.dir) if args.dir else Tablebase.get()
+    if args.verify:
+        print(f'{args.signature}: расхождений {verify(args.signature, args.verify, tb)}')
+    else:
+        print(generate(args.signature, tb, workers=args.workers, resume=not args.restart))
@@ -0,0 +1,57 @@
+from array import array
+
+EXACT, LOWER, UPPER = 1, 2, 3
+
+# ключ (8) + оценка (8) + ход (2) + глубина, граница, поколение (по 1)
+ENTRY_SIZE = 21
+MAX_SIZE_MB = 512
+
+
+class TranspositionTable:
+
+    def __init__(self, size_mb=16):
+        size_mb = min(max(size_mb, 1), MAX_SIZE_MB)
+        # число записей - степень двойки, чтобы индекс брать маской
+        entries = 1 << ((size_mb << 20) // ENTRY_SIZE).bit_length() - 1
+        self.mask = entries - 1
+        self.keys = array('Q', bytes(8 * entries))
+        self.scores = array('d', bytes(8 * entries))
+        self.moves = array('H', bytes(2 * entries))
+        self.depths = array('b', bytes(entries))
+        self.bounds = array('B', bytes(entries))
+        self.ages = array('B', bytes(entries))
+        self.age = 0
+
+    def __len__(self):
+        return self.mask + 1
+
+    def clear(self):
+        for table in (self.keys, self.scores, self.moves, self.depths, self.bounds, self.ages):
+            table[:] = array(table.typecode, bytes(table.itemsize * len(table)))
+        self.age = 0
+
+    def new_search(self):
+        self.age = (self.age + 1) & 0xFF
+
+    def probe(self, key):
+        """Возвращает (глубина, оценка, граница, ход) или None."""
+        i = key & self.mask
+        if self.bounds[i] and self.keys[i] == key:
+            return self.depths[i], self.scores[i], self.bounds[i], self.moves[i] or None
+        return None
+
+    def store(self, key, depth, score, bound, move=None):
+        i = key & self.mask
+        # замещение: пустая ячейка, та же позиция, запись прошлого поиска
+        # или поиск не меньшей глубины
+        if (self.bounds[i] and self.keys[i] != key and self.ages[i] == self.age
+                and self.depths[i] > depth):
+            return
+        if move is None and self.keys[i] == key:
+            move = self.moves[i]
+        self.keys[i] = key
+        self.scores[i] = score
+        self.moves[i] = move or 0
+        self.depths[i] = depth
+        self.bounds[i] = bound
+        self.ages[i] = self.age
@@ -0,0 +1,173 @@
+# UCI-интерфейс движка без pygame: команды читаются из stdin, ответы пишутся в stdout.
+#
+#   python uci.py
+#
+# Поддерживаются uci, isready, ucinewgame, position (startpos | fen ... [moves ...]),
+# go (depth, movetime, wtime/btime, winc/binc, infinite), stop, quit.
+# startpos - Config.START_POSITION.
+
+import sys
+import threading
+import time
+
+from bot import Minimax
+from config import Config
+from position import Position, move_name, parse_move
+
+# глубина итераций, если в go она не задана
+MAX_DEPTH = 64
+
+
+class UciEngine:
+
+    def __init__(self, output=sys.stdout):
+        self.output = output
+        self.lock = threading.Lock()
+        self.position = Position(Config.get().START_POSITION)
+        # оценки бота ведутся с точки зрения его цвета, поэтому по боту на цвет
+        self.bots = {}
+        self.bot = None
+        self.thread = None
+        self.stopped = threading.Event()
+        self.start = 0.0
+
+    def send(self, line):
+        with self.lock:
+            self.output.write(line + '\n')
+            self.output.flush()
+
+    def run(self, input=sys.stdin):
+        for line in input:
+            if not self.command(line.split()):
+                break
+        self.stop()
+        for bot in self.bots.values():
+            bot.close()
+
+    def command(self, tokens):
+        """Выполняет одну команду; False - выход."""
+        if not tokens:
+            return True
+        name, args = tokens[0], tokens[1:]
+        if name == 'uci':
+            self.send('id name Coursework KBBvKR')
+            self.send('id author coursework')
+            self.send('uciok')
+        elif name == 'isready':
+            self.send('readyok')
+        elif name == 'ucinewgame':
+            self.stop()
+            for bot in self.bots.values():
+                bot.close()
+            self.bots = {}
+        elif name == 'position':
+            self.stop()
+            self.set_position(args)
+        elif name == 'go':
+            self.stop()
+            self.go(args)
+        elif name == 'stop':
+            self.stop()
+        elif name == 'quit':
+            return False
+        return True
+
+    def set_position(self, args):
+        if not args:
+            return
+        if args[0] == 'startpos':
+            fen, rest = Config.get().START_POSITION, args[1:]
+        elif args[0] == 'fen':
+            end = args.index('moves') if 'moves' in args else len(args)
+            fen, rest = ' '.join(args[1:end]), args[end:]
+        else:
+            return
+
+        try:
+            position = Position(fen)
+        except (ValueError, IndexError):
+            self.send(f'info string неверный FEN: {fen}')
+            return
+        for name in rest[1:]:
+            try:
+                move = parse_move(name)
+            except (ValueError, IndexError):
+                # нулевой ход 0000 и опечатки
+                move = None
+            if move not in position.legal_moves():
+                self.send(f'info string неверный ход: {name}')
+                break
+            position.make_move(move)
+        self.position = position
+
+    def go(self, args):
+        options = {}
+        infinite = False
+        i = 0
+        while i < len(args):
+            if args[i] == 'infinite':
+                infinite = True
+            elif i + 1 < len(args) and args[i + 1].lstrip('-').isdigit():
+                options[args[i]] = int(args[i + 1])
+                i += 1
+            i += 1
+
+        turn = self.position.turn
+        if turn not in self.bots:
+            self.bots[turn] = Minimax(None, turn, MAX_DEPTH)
+        bot = self.bot = self.bots[turn]
+        bot.depth = options.get('depth', MAX_DEPTH)
+        bot.onIteration = self.info
+        bot.stopped = False
+        self.stopped.clear()
+
+        movetime = options['movetime'] / 1000 if 'movetime' in options else None
+        time_left = options.get('wtime' if turn == 'w' else 'btime')
+        time_left = time_left / 1000 if time_left is not None and not infinite else None
+        increment = options.get('winc' if turn == 'w' else 'binc', 0) / 1000
+
+        self.thread = threading.Thread(target=self.search,
+                                       args=(bot, self.position.copy(), time_left, increment, movetime, infinite),
+                                       daemon=True)
+        self.start = time.perf_counter()
+        self.thread.start()
+
+    def search(self, bot, position, time_left, increment, movetime, infinite):
+        bot.getBestMove(position=position, time_left=time_left, increment=increment, movetime=movetime,
+                        infinite=infinite)
+        move = bot.stats.move
+        if move is None:
+            # поиск прерван до конца первой итерации
+            moves = position.legal_moves()
+            move = move_name(moves[0]) if moves else '0000'
+        if infinite:
+            # при go infinite ход сообщается только после stop
+            self.stopped.wait()
+        self.send(f'bestmove {move}')
+
+    def info(self, record):
+        elapsed = time.perf_counter() - self.start
+        nodes = self.bot.nodes
+        score = record['score']
+        if score is None:
+            score = 'cp 0'
+        elif abs(score) >= 9999:
+            plies = len(record['pv'])
+            score = f'mate {(plies + 1) // 2 if score > 0 else -(plies // 2)}'
+        else:
+            # ладья стоит 50 единиц оценки - 500 сантипешек
+            score = f'cp {round(score * 10)}'
+        self.send(f"info depth {record['depth']} score {score} nodes {nodes} "
+                  f"nps {round(nodes / elapsed) if elapsed else 0} time {round(elapsed * 1000)} "
+                  f"pv {' '.join(record['pv'])}")
+
+    def stop(self):
+        if self.thread is not None:
+            self.bot.stop()
+            self.stopped.set()
+            self.thread.join()
+            self.thread = None
+
+
+if __name__ == '__main__':
+    UciEngine().run()